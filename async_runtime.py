@@ -0,0 +1,103 @@
+# async_runtime.py
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional
+
+from elevator import Elevator, TICK_INTERVAL
+
+class AsyncRuntime:
+    """
+    asyncio 运行时：每部电梯是同一个事件循环中的一个协程，代替"每部电梯一个操作系统线程"。
+    协程直接驱动 Elevator.step() 生成器，把每段耗时 await 成 asyncio.sleep；
+    空闲电梯 await 自己的唤醒事件，新请求经 Elevator.on_wake 回调（可来自任意线程）投递到事件循环。
+    几百部电梯只占一个线程，停止时取消协程即可，不依赖线程退出
+    """
+    def __init__(self, elevators: List[Elevator]):
+        """
+        参数说明：
+        - elevators: 由本运行时驱动的电梯（不要再调用它们的 start()）
+        """
+        self.elevators = elevators
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeups: Dict[int, asyncio.Event] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    async def run(self):
+        """在当前事件循环中运行所有电梯，直到全部停止或被取消"""
+        self._loop = asyncio.get_running_loop()
+        for elevator in self.elevators:
+            self._wakeups[elevator.elevator_id] = asyncio.Event()
+            elevator.on_wake = self._wake
+        self._tasks = [asyncio.create_task(self._drive(e), name=f"elevator-{e.elevator_id}")
+                       for e in self.elevators]
+        self._ready.set()
+        try:
+            results = await asyncio.gather(*self._tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):  # 被取消的协程返回 CancelledError（不是 Exception），忽略
+                    raise result
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            for elevator in self.elevators:
+                elevator.on_wake = None
+            self._ready.clear()
+
+    async def _drive(self, elevator: Elevator):
+        """单部电梯的协程：与 Elevator.run 相同的循环，休眠换成 await"""
+        wakeup = self._wakeups[elevator.elevator_id]
+        while elevator.running:
+            wakeup.clear()  # 先清除再检查请求，避免丢失检查期间到达的唤醒
+            step = elevator.step()
+            while True:
+                probe = elevator.probe  # 剖析可在运行中开关，每段动作重新读取
+                start = time.perf_counter()
+                delay = next(step, None)
+                if probe is not None:
+                    probe.record("compute", time.perf_counter() - start)
+                if delay is None:
+                    break
+                start = time.perf_counter()
+                await asyncio.sleep(delay)
+                if probe is not None:
+                    probe.record("sleep", time.perf_counter() - start)
+            if elevator.was_idle:
+                await wakeup.wait()  # 空闲时挂起，有新请求或停止运行时被唤醒
+            else:
+                await asyncio.sleep(TICK_INTERVAL)
+
+    def _wake(self, elevator: Elevator):
+        """Elevator.on_wake 回调：可能来自界面线程，经 call_soon_threadsafe 投递到事件循环"""
+        event = self._wakeups.get(elevator.elevator_id)
+        if event is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass  # 事件循环已关闭
+
+    # ========== 在后台线程中运行（供 Gradio 等同步程序使用） ==========
+    def start(self):
+        """在一个后台线程中启动事件循环，返回时所有电梯协程都已开始运行"""
+        self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), name="elevator-runtime", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        """停止所有电梯：各协程在当前动作结束后退出"""
+        for elevator in self.elevators:
+            elevator.stop(release=False)
+
+    def cancel(self):
+        """立即取消所有电梯协程（不等当前动作结束）"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            for task in self._tasks:
+                loop.call_soon_threadsafe(task.cancel)
+
+    def join(self, timeout: float = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
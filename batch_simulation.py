@@ -0,0 +1,385 @@
+# batch_simulation.py
+import numpy as np
+from elevator import MOVE_TIME, DOOR_TIME, TICK_INTERVAL
+
+# 方向编码（对应 Direction.NONE / UP / DOWN）
+NONE, UP, DOWN = 0, 1, 2
+# 请求种类编码：内部请求 / 外部上行 / 外部下行
+CABIN, HALL_UP, HALL_DOWN = 0, 1, 2
+# 电梯所处阶段：对应 Elevator.step() 生成器中每个 yield 之后的续点
+DECIDE = 0            # 一步开始：判断请求、选择目标
+AFTER_OPEN = 1        # 开门等待结束：移除已响应请求，开始关门
+AFTER_CLOSE = 2       # 停靠后关门结束
+AFTER_CLOSE_MOVE = 3  # 为出发而关门结束：移动一层
+
+NEVER = np.iinfo(np.int64).max  # 空闲挂起电梯的 ready_at
+
+class BatchSimulation:
+    """
+    向量化批量仿真：把大量互相独立的大楼放进 NumPy 数组一起推进，用于参数扫描。
+    每部电梯的决策与 Elevator.next_stop / step 完全一致（SHARED 策略：所有电梯共享本楼外部请求），
+    动作耗时取自 elevator.py，并量化为 dt 的整数倍；时间直接跳到下一个事件，而非逐 tick 空转。
+
+    所有电梯（跨大楼）展平为一维，下标 n 对应 building[n] 号楼的第 n % max_cars 部电梯。
+    与离散事件仿真 Simulation 的差异只在"同一时刻多个事件"的处理顺序：
+    同一时刻先注入请求，再处理各电梯的续点（开关门、移动），最后做新的决策。
+    """
+    def __init__(self, num_buildings: int, num_elevators, num_floors, dt: float = 0.1):
+        """
+        参数说明：
+        - num_buildings: 大楼数量
+        - num_elevators: 每栋楼的电梯数（整数，或长度为 num_buildings 的数组）
+        - num_floors: 每栋楼的楼层数（整数，或长度为 num_buildings 的数组）
+        - dt: 时间量化步长（秒），所有动作耗时必须是它的整数倍
+        """
+        self.dt = dt
+        self.move_ticks = self._ticks(MOVE_TIME)
+        self.door_ticks = self._ticks(DOOR_TIME)
+        self.tick_ticks = self._ticks(TICK_INTERVAL)
+
+        self.num_buildings = num_buildings
+        self.num_elevators = np.broadcast_to(np.asarray(num_elevators, dtype=np.int32), (num_buildings,)).copy()
+        self.num_floors = np.broadcast_to(np.asarray(num_floors, dtype=np.int32), (num_buildings,)).copy()
+        self.max_cars = int(self.num_elevators.max())
+        width = int(self.num_floors.max()) + 2  # 楼层下标 1..F，两端留空
+
+        n = num_buildings * self.max_cars
+        self.building = np.repeat(np.arange(num_buildings), self.max_cars)
+        active = np.arange(self.max_cars)[None, :] < self.num_elevators[:, None]
+        self.floor = np.ones(n, dtype=np.int32)
+        self.direction = np.full(n, NONE, dtype=np.int8)
+        self.history_direction = np.full(n, NONE, dtype=np.int8)
+        self.door_open = np.zeros(n, dtype=bool)
+        self.phase = np.full(n, DECIDE, dtype=np.int8)
+        self.target = np.ones(n, dtype=np.int32)
+        # 下一次推进的时刻（tick）；空闲挂起或不存在的电梯为 NEVER，下一个事件只需取一次最小值
+        self.ready_at = np.where(active.ravel(), 0, NEVER).astype(np.int64)
+        self.idle = np.zeros(n, dtype=bool)
+
+        # 请求位图与时间戳（无请求时时间戳为 inf）
+        self.cabin = np.zeros((n, width), dtype=bool)
+        self.cabin_ts = np.full((n, width), np.inf)
+        self.hall = np.zeros((num_buildings, 2, width), dtype=bool)   # [:, 0] 上行，[:, 1] 下行
+        self.hall_ts = np.full((num_buildings, 2, width), np.inf)
+        # 请求的加入序号：时间戳相同时按加入顺序决定"最早请求"，与 Elevator._earliest_request 一致
+        self.cabin_seq = np.zeros((n, width), dtype=np.int64)
+        self.hall_seq = np.zeros((num_buildings, 2, width), dtype=np.int64)
+        self._seq = 0
+        self._floors = np.arange(width)
+
+        # 每栋楼的统计
+        self.served_calls = np.zeros(num_buildings, dtype=np.int64)
+        self.total_wait = np.zeros(num_buildings)
+        self.moves = np.zeros(num_buildings, dtype=np.int64)
+        self.door_cycles = np.zeros(num_buildings, dtype=np.int64)
+
+        self.now = 0  # 当前时刻（tick）
+        self._call_ticks = np.zeros(0, dtype=np.int64)
+        self._calls = np.zeros(0, dtype=[("building", np.int32), ("floor", np.int32), ("kind", np.int8), ("car", np.int64)])
+        self._next_call = 0
+
+    def _ticks(self, seconds: float) -> int:
+        ticks = round(seconds / self.dt)
+        if abs(ticks * self.dt - seconds) > 1e-9:
+            raise ValueError(f"动作耗时 {seconds} 秒不是 dt={self.dt} 的整数倍")
+        return ticks
+
+    # ========== 请求注入 ==========
+    def add_calls(self, times, buildings, floors, kinds, cars=None):
+        """
+        批量加入请求（时间会量化到 dt）：
+        - kinds: CABIN / HALL_UP / HALL_DOWN
+        - cars: 内部请求所在的电梯在本楼中的下标（从 0 开始），外部请求忽略
+        """
+        ticks = np.round(np.asarray(times, dtype=float) / self.dt).astype(np.int64)
+        buildings = np.asarray(buildings)
+        calls = np.zeros(len(ticks), dtype=self._calls.dtype)
+        calls["building"] = buildings
+        calls["floor"] = floors
+        calls["kind"] = kinds
+        calls["car"] = buildings * self.max_cars + (0 if cars is None else np.asarray(cars))
+
+        ticks = np.concatenate([self._call_ticks[self._next_call:], ticks])
+        calls = np.concatenate([self._calls[self._next_call:], calls])
+        order = np.argsort(ticks, kind="stable")
+        self._call_ticks, self._calls, self._next_call = ticks[order], calls[order], 0
+
+    def _inject(self):
+        """注入当前时刻到达的请求，并唤醒相关的空闲电梯"""
+        start = self._next_call
+        if start == len(self._call_ticks) or self._call_ticks[start] > self.now:
+            return
+        end = np.searchsorted(self._call_ticks, self.now, side="right")
+        calls = self._calls[start:end]
+        self._next_call = end
+        t = self.now * self.dt
+
+        # 同一时刻的请求按加入顺序编号；同一按钮在本时刻重复按下时，花式索引赋值以最后一次为准，
+        # 因此倒序写入，让每个按钮保留本时刻第一次按下的序号
+        seq = self._seq + np.arange(len(calls))
+        self._seq += len(calls)
+
+        is_cabin = calls["kind"] == CABIN
+        cabin, cabin_seq = calls[is_cabin][::-1], seq[is_cabin][::-1]
+        if len(cabin):
+            n, f = cabin["car"], cabin["floor"]
+            self.cabin_seq[n, f] = np.where(self.cabin[n, f], self.cabin_seq[n, f], cabin_seq)  # 重复请求保留原序号
+            self.cabin_ts[n, f] = np.where(self.cabin[n, f], self.cabin_ts[n, f], t)  # 重复请求保留原时间戳
+            self.cabin[n, f] = True
+            self._wake(n)
+
+        hall, hall_seq = calls[~is_cabin][::-1], seq[~is_cabin][::-1]
+        if len(hall):
+            b, i, f = hall["building"], hall["kind"] - HALL_UP, hall["floor"]
+            self.hall_seq[b, i, f] = np.where(self.hall[b, i, f], self.hall_seq[b, i, f], hall_seq)
+            self.hall_ts[b, i, f] = np.where(self.hall[b, i, f], self.hall_ts[b, i, f], t)
+            self.hall[b, i, f] = True
+            cars = (np.unique(b)[:, None] * self.max_cars + np.arange(self.max_cars)).ravel()
+            self._wake(cars)
+
+    def _wake(self, cars):
+        woken = cars[self.idle[cars]]
+        self.idle[woken] = False
+        self.ready_at[woken] = self.now
+
+    # ========== 推进 ==========
+    def run(self, until: float):
+        """推进到虚拟时刻 until（秒），时间直接跳到下一个事件"""
+        end = round(until / self.dt)
+        while True:
+            next_call = self._call_ticks[self._next_call] if self._next_call < len(self._call_ticks) else NEVER
+            self.now = max(self.now, min(self.ready_at.min(), next_call))
+            if self.now > end:
+                break
+            self._inject()
+            self._advance()
+        self.now = end
+
+    def _advance(self):
+        # 先取出本时刻到期的电梯及其阶段，每部电梯在同一时刻只推进一个续点
+        ready = np.flatnonzero(self.ready_at <= self.now)
+        phase = self.phase[ready]
+
+        # 续点：开门结束 -> 移除已响应请求并关门
+        n = ready[phase == AFTER_OPEN]
+        if len(n):
+            self._remove_handled(n)
+            self._wait(n, self.door_ticks, AFTER_CLOSE)
+
+        # 续点：停靠后关门结束 -> 调度间隔
+        n = ready[phase == AFTER_CLOSE]
+        if len(n):
+            self.door_open[n] = False
+            self._wait(n, self.tick_ticks, DECIDE)
+
+        # 续点：出发前关门结束 -> 移动一层
+        n = ready[phase == AFTER_CLOSE_MOVE]
+        if len(n):
+            self.door_open[n] = False
+            self._move(n)
+
+        # 新的一步
+        n = ready[phase == DECIDE]
+        if len(n):
+            self._decide(n)
+
+    def _wait(self, n, ticks, phase):
+        self.ready_at[n] = self.now + ticks
+        self.phase[n] = phase
+
+    def _move(self, n):
+        self.floor[n] += np.sign(self.target[n] - self.floor[n]).astype(np.int32)
+        np.add.at(self.moves, self.building[n], 1)
+        self._wait(n, self.move_ticks + self.tick_ticks, DECIDE)
+
+    def _remove_handled(self, n):
+        """对应 Elevator.remove_handled_requests：清除本层内部请求，以及与运行方向一致的外部请求"""
+        cur = self.floor[n]
+        self.cabin[n, cur] = False
+        self.cabin_ts[n, cur] = np.inf
+
+        b, d = self.building[n], self.direction[n]
+        for intent, direction in ((0, UP), (1, DOWN)):
+            sel = (d == direction) | (d == NONE)
+            bb, ff = b[sel], cur[sel]
+            hit = self.hall[bb, intent, ff]
+            if not hit.any():
+                continue
+            bb, ff = bb[hit], ff[hit]
+            if len(bb) > 1:
+                # 同一时刻同楼同层可能有多部电梯停靠，只统计一次
+                width = self.hall.shape[2]
+                key = np.unique(bb.astype(np.int64) * width + ff)
+                bb, ff = key // width, key % width
+            np.add.at(self.served_calls, bb, 1)
+            np.add.at(self.total_wait, bb, self.now * self.dt - self.hall_ts[bb, intent, ff])
+            self.hall[bb, intent, ff] = False
+            self.hall_ts[bb, intent, ff] = np.inf
+
+    def _decide(self, n):
+        """对应 Elevator.step 开头与 Elevator.next_stop 的向量化实现"""
+        b = self.building[n]
+        cab = self.cabin[n]
+        up = self.hall[b, 0]
+        down = self.hall[b, 1]
+        pending = cab | up | down
+        has = pending.any(axis=1)
+
+        # 没有请求：空闲挂起（不改变历史方向，与 step 一致）
+        if not has.all():
+            gone = n[~has]
+            self.direction[gone] = NONE
+            self.idle[gone] = True
+            self.ready_at[gone] = NEVER
+            n, b = n[has], b[has]
+            if not len(n):
+                return
+            cab, up, down, pending = cab[has], up[has], down[has], pending[has]
+
+        k = np.arange(len(n))
+        cur = self.floor[n]
+        here = pending[k, cur]
+        above = pending & (self._floors > cur[:, None])
+        below = pending & (self._floors < cur[:, None])
+        any_above, any_below = above.any(axis=1), below.any(axis=1)
+        serve_up = cab | up
+        serve_down = cab | down
+        d = self.direction[n]
+        target = np.full(len(n), -1, dtype=np.int32)
+
+        # 空闲：本层有请求直接响应；否则历史方向，最后朝最早请求的方向出发
+        idle = d == NONE
+        if idle.any():
+            target[idle & here] = cur[idle & here]
+            rest = idle & ~here
+            hist = self.history_direction[n]
+            to_up = rest & (hist == UP) & any_above
+            to_down = rest & ~to_up & (hist == DOWN) & any_below
+            earliest = rest & ~to_up & ~to_down
+            if earliest.any():
+                d[earliest] = np.where(self._earliest_floor(n[earliest], b[earliest]) > cur[earliest], UP, DOWN)
+            d[to_up] = UP
+            d[to_down] = DOWN
+
+        # 上行 / 下行：LOOK 扫描
+        for direction, reverse, ahead, behind, serve_ahead, serve_behind, any_ahead in (
+                (UP, DOWN, above, below, serve_up, serve_down, any_above),
+                (DOWN, UP, below, above, serve_down, serve_up, any_below)):
+            sel = (d == direction) & (target < 0)
+            if not sel.any():
+                continue
+            stop_here = sel & serve_ahead[k, cur]
+            target[stop_here] = cur[stop_here]
+
+            go = sel & ~stop_here & any_ahead
+            target[go] = self._sweep(ahead[go], serve_ahead[go] & ahead[go], direction)
+
+            turn = sel & ~stop_here & ~any_ahead
+            if turn.any():
+                d[turn] = reverse
+                turn_here = turn & here
+                target[turn_here] = cur[turn_here]
+                go_back = turn & ~here
+                target[go_back] = self._sweep(behind[go_back], serve_behind[go_back] & behind[go_back], reverse)
+
+        self.direction[n] = d
+        self.target[n] = target
+
+        at = target == cur
+        door = self.door_open[n]
+        # 到达目标层：开门（已开门则直接移除请求后关门）
+        open_ = n[at & ~door]
+        self.door_open[open_] = True
+        np.add.at(self.door_cycles, self.building[open_], 1)
+        self._wait(open_, self.door_ticks, AFTER_OPEN)
+        if door.any():
+            opened = n[at & door]
+            self._remove_handled(opened)
+            self._wait(opened, self.door_ticks, AFTER_CLOSE)
+            # 未到目标层：门开着先关门
+            self._wait(n[~at & door], self.door_ticks, AFTER_CLOSE_MOVE)
+        # 未到目标层且门已关：直接移动一层
+        self._move(n[~at & ~door])
+
+    def _earliest_floor(self, n, b):
+        """
+        对应 Elevator._earliest_request：时间戳最小的请求所在楼层。
+        时间戳相同时内部请求优先，同类请求中先加入的优先（外部请求不分方向按加入顺序）
+        """
+        cabin_ts, hall_ts = self.cabin_ts[n], self.hall_ts[b]
+        earliest = np.minimum(cabin_ts.min(axis=1), hall_ts.min(axis=(1, 2)))
+        cabin = cabin_ts == earliest[:, None]
+        cabin_floor = np.where(cabin, self.cabin_seq[n], NEVER).argmin(axis=1)
+        hall = (hall_ts == earliest[:, None, None]).reshape(len(n), -1)
+        hall_floor = np.where(hall, self.hall_seq[b].reshape(len(n), -1), NEVER).argmin(axis=1) % hall_ts.shape[2]
+        return np.where(cabin.any(axis=1), cabin_floor, hall_floor)
+
+    def _sweep(self, candidates, serving, direction):
+        """对应 Elevator.next_stop 中的扫描目标：最近的顺路楼层，否则最远的反向请求楼层"""
+        width = candidates.shape[1]
+        lowest = lambda m: m.argmax(axis=1)
+        highest = lambda m: width - 1 - m[:, ::-1].argmax(axis=1)
+        has_serving = serving.any(axis=1)
+        if direction == UP:
+            return np.where(has_serving, lowest(serving), highest(candidates))
+        return np.where(has_serving, highest(serving), lowest(candidates))
+
+    # ========== 结果 ==========
+    def pending_calls(self):
+        """每栋楼尚未响应的请求数"""
+        cabin = self.cabin.sum(axis=1).reshape(self.num_buildings, self.max_cars).sum(axis=1)
+        return cabin + self.hall.sum(axis=(1, 2))
+
+    def summary(self):
+        """每栋楼的统计结果（数组）"""
+        served = np.maximum(self.served_calls, 1)
+        return {
+            "num_elevators": self.num_elevators,
+            "num_floors": self.num_floors,
+            "served_calls": self.served_calls,
+            "mean_wait": np.where(self.served_calls > 0, self.total_wait / served, np.nan),
+            "moves": self.moves,
+            "door_cycles": self.door_cycles,
+            "pending": self.pending_calls(),
+        }
+
+
+def poisson_calls(num_buildings: int, duration: float, mean_interval: float, num_elevators, num_floors,
+                  dt: float = 0.1, seed: int = None):
+    """
+    为每栋楼生成泊松到达的随机请求（与 simulation.add_random_calls 分布相同），
+    返回可直接传给 BatchSimulation.add_calls 的 (times, buildings, floors, kinds, cars)
+    """
+    rng = np.random.default_rng(seed)
+    num_elevators = np.broadcast_to(np.asarray(num_elevators), (num_buildings,))
+    num_floors = np.broadcast_to(np.asarray(num_floors), (num_buildings,))
+    counts = rng.poisson(duration / mean_interval, num_buildings)
+    buildings = np.repeat(np.arange(num_buildings), counts)
+    n = len(buildings)
+
+    times = np.round(rng.uniform(0, duration, n) / dt) * dt
+    floors = rng.integers(1, num_floors[buildings] + 1)
+    kinds = np.where(rng.random(n) < 0.5, CABIN, np.where(rng.random(n) < 0.5, HALL_UP, HALL_DOWN))
+    kinds = np.where((kinds != CABIN) & (floors == 1), HALL_UP, kinds)
+    kinds = np.where((kinds != CABIN) & (floors == num_floors[buildings]), HALL_DOWN, kinds)
+    cars = rng.integers(0, num_elevators[buildings])
+    return times, buildings, floors, kinds, cars
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    buildings = 1000
+    elevators = rng.integers(2, 9, buildings)
+    floors = rng.integers(10, 41, buildings)
+    batch = BatchSimulation(buildings, elevators, floors)
+    batch.add_calls(*poisson_calls(buildings, 3600, 30, elevators, floors, seed=0))
+
+    wall_start = time.perf_counter()
+    batch.run(3600)
+    wall = time.perf_counter() - wall_start
+
+    result = batch.summary()
+    print(f"{buildings} 栋楼各仿真 1 小时，耗时 {wall:.2f} 秒，共响应外部请求 {result['served_calls'].sum()} 个，"
+          f"平均候梯 {np.nanmean(result['mean_wait']):.2f} 秒")
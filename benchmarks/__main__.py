@@ -0,0 +1,97 @@
+# benchmarks/__main__.py
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks import bench_contention, bench_dispatcher, bench_elevator, bench_simulation
+
+SUITES = {
+    "dispatcher": bench_dispatcher,
+    "elevator": bench_elevator,
+    "contention": bench_contention,
+    "simulation": bench_simulation,
+}
+
+# 指标的比较方向：越小越好 / 越大越好；其余指标（事件数、平均候梯时间）应与基线完全一致
+LOWER_IS_BETTER = ("seconds_per_op",)
+HIGHER_IS_BETTER = ("ops_per_second", "requests_per_second", "events_per_second")
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def _key(entry) -> str:
+    return entry["name"] + json.dumps(entry["params"], sort_keys=True)
+
+def compare(baseline, current, threshold: float) -> int:
+    """逐项与基线比较并打印，返回性能退化超过 threshold（比例）或行为不一致的项数"""
+    old = {_key(e): e for e in baseline["results"]}
+    problems = 0
+    for entry in current["results"]:
+        base = old.get(_key(entry))
+        if base is None:
+            continue
+        for metric, value in entry.items():
+            if metric in ("name", "params") or metric not in base:
+                continue
+            before = base[metric]
+            if metric in LOWER_IS_BETTER:
+                change = value / before - 1
+            elif metric in HIGHER_IS_BETTER:
+                change = before / value - 1
+            else:
+                if value != before:
+                    problems += 1
+                    print(f"[不一致] {_key(entry)} {metric}: {before} -> {value}")
+                continue
+            flag = "退化" if change > threshold else "    "
+            problems += change > threshold
+            print(f"[{flag}] {_key(entry)} {metric}: {before:.4g} -> {value:.4g} ({-change:+.1%})")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="调度器、电梯决策、锁竞争与端到端仿真的基准测试")
+    parser.add_argument("suites", nargs="*", choices=[[], *SUITES], default=[], help="要运行的测试组（默认全部）")
+    parser.add_argument("--quick", action="store_true", help="减少迭代次数，快速冒烟")
+    parser.add_argument("--seed", type=int, default=0, help="工作负载的随机种子")
+    parser.add_argument("--output", "-o", default=None, help="结果 JSON 文件（默认输出到终端）")
+    parser.add_argument("--compare", default=None, help="与之前保存的结果 JSON 比较")
+    parser.add_argument("--threshold", type=float, default=0.10, help="判定为退化的变慢比例")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.time(),
+        "quick": args.quick,
+        "seed": args.seed,
+        "results": [],
+    }
+    for name in args.suites or SUITES:
+        print(f"运行 {name} ...", file=sys.stderr)
+        report["results"].extend(SUITES[name].run(quick=args.quick, seed=args.seed))
+
+    text = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare(baseline, report, args.threshold)
+        print(f"与 {baseline.get('commit')} 相比：{problems} 项退化或不一致", file=sys.stderr)
+        sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
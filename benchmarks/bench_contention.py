@@ -0,0 +1,61 @@
+# benchmarks/bench_contention.py
+import threading
+import time
+from typing import Dict, List
+
+from building import BuildingConfig
+from dispatcher import Dispatcher
+from elevator import Elevator
+from gui.elevator_state import state_manager
+from request import Direction, Request, RequestType, UserIntent
+from benchmarks.common import result
+
+THREAD_COUNTS = (1, 2, 4, 8)
+
+def _run_threads(count: int, ops: int, work) -> float:
+    """count 个线程各执行 ops 次 work(thread_index, i)，返回总吞吐量（次 / 秒）"""
+    barrier = threading.Barrier(count + 1)
+
+    def _worker(index: int):
+        barrier.wait()
+        for i in range(ops):
+            work(index, i)
+
+    threads = [threading.Thread(target=_worker, args=(k,)) for k in range(count)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return count * ops / (time.perf_counter() - start)
+
+def run(quick: bool = False, seed: int = 0) -> List[Dict]:
+    results = []
+    ops = 2000 if quick else 20000
+    for count in THREAD_COUNTS:
+        # 模拟 N 部电梯线程：每次读取快照，每 10 次写入一次（添加并移除本线程专属楼层的请求）
+        building = BuildingConfig(num_elevators=count, num_floors=2 * count + 2)
+        dispatcher = Dispatcher(verbose=False, building=building)
+        for eid in building.elevator_ids():
+            Elevator(eid, dispatcher, logger=None)
+
+        def dispatch_work(index: int, i: int):
+            floor = index + 2
+            if i % 10 == 0:
+                dispatcher.add_request(Request(floor, RequestType.EXTERNAL, UserIntent.UP, timestamp=0.0))
+                dispatcher.remove_request(floor, index + 1, UserIntent.UP)
+            else:
+                dispatcher.has_request_at(floor)
+                dispatcher.nearest_above(floor)
+
+        results.append(result("contention.dispatcher", {"threads": count},
+                              ops_per_second=_run_threads(count, ops, dispatch_work)))
+
+        # N 个线程同时写各自电梯的界面状态
+        def state_work(index: int, i: int):
+            state_manager.update_elevator(index + 1, i % 20 + 1, Direction.UP, bool(i & 1))
+
+        results.append(result("contention.state_manager", {"threads": count},
+                              ops_per_second=_run_threads(count, ops, state_work)))
+    return results
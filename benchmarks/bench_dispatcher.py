@@ -0,0 +1,48 @@
+# benchmarks/bench_dispatcher.py
+import random
+from typing import Dict, List
+
+from building import BuildingConfig
+from dispatcher import Dispatcher, DispatchPolicy
+from elevator import Elevator
+from request import Request, RequestType, UserIntent
+from benchmarks.common import measure, result
+
+QUEUE_SIZES = (10, 100, 1000)
+
+def _loaded_dispatcher(size: int, policy: DispatchPolicy, seed: int):
+    """外部请求池中已有 size 个请求（每层上下各一个）的调度器"""
+    building = BuildingConfig(num_elevators=5, num_floors=size // 2 + 2)
+    dispatcher = Dispatcher(verbose=False, policy=policy, building=building)
+    elevators = [Elevator(eid, dispatcher, logger=None) for eid in building.elevator_ids()]
+    rng = random.Random(seed)
+    for elevator in elevators:
+        elevator.current_floor = rng.randint(1, building.num_floors)
+    keys = [(floor, intent) for floor in range(2, building.num_floors) for intent in UserIntent][:size]
+    rng.shuffle(keys)
+    for floor, intent in keys:
+        dispatcher.add_request(Request(floor, RequestType.EXTERNAL, intent, timestamp=0.0))
+    return dispatcher, building
+
+def run(quick: bool = False, seed: int = 0) -> List[Dict]:
+    results = []
+    repeat = 1 if quick else 5
+    for policy in (DispatchPolicy.SHARED, DispatchPolicy.ETA):
+        for size in QUEUE_SIZES:
+            dispatcher, building = _loaded_dispatcher(size, policy, seed)
+            params = {"policy": policy.name, "queue_size": size}
+            # 顶层的下行按钮始终空闲：添加后再移除，队列长度保持为 size
+            top = building.num_floors
+            probe = Request(top, RequestType.EXTERNAL, UserIntent.DOWN, timestamp=0.0)
+
+            def add_remove():
+                dispatcher.add_request(probe)
+                dispatcher.remove_request(top, 1, UserIntent.DOWN)
+
+            results.append(result("dispatcher.add_remove", params,
+                                  seconds_per_op=measure(add_remove, repeat)))
+            results.append(result("dispatcher.get_requests", params,
+                                  seconds_per_op=measure(dispatcher.get_requests, repeat)))
+            results.append(result("dispatcher.nearest_above", params,
+                                  seconds_per_op=measure(lambda: dispatcher.nearest_above(1), repeat)))
+    return results
@@ -0,0 +1,35 @@
+# benchmarks/bench_elevator.py
+import random
+from typing import Dict, List
+
+from building import BuildingConfig
+from dispatcher import Dispatcher
+from elevator import Elevator
+from request import Direction, Request, RequestType, UserIntent
+from benchmarks.common import measure, result
+
+QUEUE_SIZES = (10, 100, 1000)
+
+def run(quick: bool = False, seed: int = 0) -> List[Dict]:
+    results = []
+    repeat = 1 if quick else 5
+    for size in QUEUE_SIZES:
+        building = BuildingConfig(num_elevators=1, num_floors=size + 2)
+        dispatcher = Dispatcher(verbose=False, building=building)
+        elevator = Elevator(1, dispatcher, logger=None)
+        rng = random.Random(seed)
+        # 一半内部请求、一半外部请求，电梯停在中间楼层
+        for _ in range(size // 2):
+            elevator.add_request(Request(rng.randint(1, building.num_floors), RequestType.INTERNAL, timestamp=0.0))
+            dispatcher.add_request(Request(rng.randint(2, building.num_floors - 1), RequestType.EXTERNAL,
+                                           rng.choice(list(UserIntent)), timestamp=0.0))
+        elevator.current_floor = building.num_floors // 2
+
+        for direction in Direction:
+            def decide(direction=direction):
+                elevator.direction = direction
+                elevator.next_stop()
+
+            results.append(result("elevator.next_stop", {"queue_size": size, "direction": direction.name},
+                                  seconds_per_op=measure(decide, repeat)))
+    return results
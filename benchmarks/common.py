@@ -0,0 +1,19 @@
+# benchmarks/common.py
+import timeit
+from typing import Callable, Dict
+
+def measure(fn: Callable[[], None], repeat: int = 5) -> float:
+    """
+    返回 fn 的单次耗时（秒）：先按 timeit 的 autorange 确定每轮调用次数（每轮至少 0.2 秒），
+    再重复 repeat 轮取最快的一轮，慢操作（如长队列下的改派）也不会跑太久
+    """
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        best = min(best, timer.timeit(number) / number)
+    return best
+
+def result(name: str, params: Dict, **values) -> Dict:
+    """一条基准结果：name + 参数唯一确定一项，values 为测得的指标"""
+    return {"name": name, "params": params, **values}
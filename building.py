@@ -0,0 +1,33 @@
+# building.py
+
+class BuildingConfig:
+    """
+    大楼配置：电梯数、楼层数等，由调度器、电梯、状态管理和界面共享同一份实例。
+    参数说明：
+    - num_elevators: 电梯数量（电梯号为 1..num_elevators）
+    - num_floors: 楼层数（楼层号为 1..num_floors）
+    """
+    __slots__ = ("num_elevators", "num_floors")
+
+    def __init__(self, num_elevators: int = 5, num_floors: int = 20):
+        if num_elevators < 1:
+            raise ValueError(f"电梯数必须为正整数: {num_elevators}")
+        if num_floors < 2:
+            raise ValueError(f"楼层数至少为 2: {num_floors}")
+        self.num_elevators = num_elevators
+        self.num_floors = num_floors
+
+    def floors(self) -> range:
+        return range(1, self.num_floors + 1)
+
+    def elevator_ids(self) -> range:
+        return range(1, self.num_elevators + 1)
+
+    def has_floor(self, floor: int) -> bool:
+        return 1 <= floor <= self.num_floors
+
+    def __repr__(self):
+        return f"<BuildingConfig elevators={self.num_elevators}, floors={self.num_floors}>"
+
+
+DEFAULT_BUILDING = BuildingConfig()  # 20 层 5 部电梯（原界面布局）
@@ -0,0 +1,224 @@
+# checkpoint.py
+import argparse
+import os
+import struct
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from building import BuildingConfig
+from dispatcher import Dispatcher, DispatchPolicy
+from elevator import Elevator
+from log_writer import LogWriter
+from request import Direction, Request, RequestType, UserIntent
+from simulation import Simulation
+from traffic import add_traffic
+
+# ========== 二进制格式（小端） ==========
+# 文件头：魔数、版本、电梯数、楼层数、调度策略、保存时刻
+# 每部电梯：楼层、方向、历史方向、标志位（门开 / 空闲）、内部请求数，随后是 (楼层, 时间戳) × 内部请求数
+# 外部请求：请求数，随后是 (楼层, 方向, 负责电梯号（0 表示未分配）, 时间戳) × 请求数
+MAGIC = b"ELCP"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHHBd")
+_CAR = struct.Struct("<HBBBH")
+_CABIN = struct.Struct("<Hd")
+_COUNT = struct.Struct("<I")
+_CALL = struct.Struct("<HBHd")
+
+_DIRECTIONS = (Direction.NONE, Direction.UP, Direction.DOWN)
+_DIRECTION_CODES = {d: i for i, d in enumerate(_DIRECTIONS)}
+_INTENTS = (UserIntent.UP, UserIntent.DOWN)
+_INTENT_CODES = {i: n for n, i in enumerate(_INTENTS)}
+_POLICIES = tuple(DispatchPolicy)
+_POLICY_CODES = {p: n for n, p in enumerate(_POLICIES)}
+
+_DOOR_OPEN = 1
+_IDLE = 2
+
+def _decode(table: tuple, code: int, what: str):
+    """按编码查表，编码越界（文件损坏）时与其它损坏情况一样抛出 ValueError"""
+    if code >= len(table):
+        raise ValueError(f"检查点文件损坏：未知的{what}编码 {code}")
+    return table[code]
+
+class CarState:
+    """
+    一部电梯的检查点状态。
+    参数说明：
+    - floor / direction / history_direction / door_open / was_idle: 与 Elevator 的同名属性一致
+    - cabin: 内部请求 [(楼层, 时间戳)]，按按下的先后排列
+    """
+    __slots__ = ("floor", "direction", "history_direction", "door_open", "was_idle", "cabin")
+
+    def __init__(self, floor: int, direction: Direction, history_direction: Direction,
+                 door_open: bool, was_idle: bool, cabin: List[Tuple[int, float]]):
+        self.floor = floor
+        self.direction = direction
+        self.history_direction = history_direction
+        self.door_open = door_open
+        self.was_idle = was_idle
+        self.cabin = cabin
+
+
+class Checkpoint:
+    """
+    整栋楼的运行状态快照：各电梯的位置、方向、门状态、内部请求，调度器中的外部请求及其分配，以及时钟。
+    只保存"停在调度步边界"的状态：恢复后每部电梯从一个新的调度步开始，
+    正在进行的那一段移动或开关门不会重放（最多提前约一个动作的时长）。
+    统计指标和尚未发生的未来事件（如已排程的交通流）不在检查点中，恢复后由调用方重新排入
+    参数说明：
+    - building: 大楼配置
+    - policy: 外部请求的调度策略
+    - now: 保存时刻（离散事件仿真为虚拟时钟，线程模式为 time.time()）
+    - cars: 按电梯号排列的 CarState
+    - calls: 外部请求 [(楼层, 方向, 负责电梯号或 None, 时间戳)]，按加入顺序排列
+    """
+    __slots__ = ("building", "policy", "now", "cars", "calls")
+
+    def __init__(self, building: BuildingConfig, policy: DispatchPolicy, now: float,
+                 cars: List[CarState], calls: List[Tuple[int, UserIntent, Optional[int], float]]):
+        self.building = building
+        self.policy = policy
+        self.now = now
+        self.cars = cars
+        self.calls = calls
+
+    # ========== 采集与恢复 ==========
+    @classmethod
+    def capture(cls, dispatcher: Dispatcher, elevators: Iterable[Elevator], now: float = None) -> "Checkpoint":
+        """采集当前状态；线程模式下各电梯仍在运行时也可调用，读到的是每部电梯各自最近的状态"""
+        cars = []
+        for elevator in elevators:
+            cabin = [(request.floor, request.timestamp) for request in elevator.internal_requests]
+            cars.append(CarState(elevator.current_floor, elevator.direction, elevator.history_direction,
+                                 elevator.door_open, elevator.was_idle, cabin))
+        calls = [(request.floor, request.user_intent, dispatcher.owner(request.floor, request.user_intent),
+                  request.timestamp) for request in dispatcher.get_requests()]
+        return cls(dispatcher.building, dispatcher.policy, time.time() if now is None else now, cars, calls)
+
+    def apply(self, dispatcher: Dispatcher, elevators: List[Elevator]):
+        """
+        把状态恢复到新建的调度器与电梯上（在电梯开始运行之前调用）。
+        外部请求按原顺序重新加入调度器：MANUAL 策略保留原来的负责电梯，ETA 策略按恢复后的电梯状态重新分配
+        """
+        building = dispatcher.building
+        if (building.num_elevators, building.num_floors) != (self.building.num_elevators, self.building.num_floors):
+            raise ValueError(f"检查点的大楼配置 {self.building} 与当前配置 {building} 不一致")
+        if len(elevators) != len(self.cars):
+            raise ValueError(f"检查点有 {len(self.cars)} 部电梯，当前有 {len(elevators)} 部")
+
+        for elevator, car in zip(elevators, self.cars):
+            elevator.restore_state(car.floor, car.direction, car.history_direction, car.door_open, car.was_idle)
+            for floor, timestamp in car.cabin:
+                elevator.add_request(Request(floor, RequestType.INTERNAL, timestamp=timestamp))
+        for floor, intent, owner, timestamp in self.calls:
+            dispatcher.add_request(Request(floor, RequestType.EXTERNAL, intent, timestamp=timestamp), owner)
+
+    # ========== 序列化 ==========
+    def to_bytes(self) -> bytes:
+        building = self.building
+        parts = [_HEADER.pack(MAGIC, VERSION, building.num_elevators, building.num_floors,
+                              _POLICY_CODES[self.policy], self.now)]
+        for car in self.cars:
+            flags = (_DOOR_OPEN if car.door_open else 0) | (_IDLE if car.was_idle else 0)
+            parts.append(_CAR.pack(car.floor, _DIRECTION_CODES[car.direction],
+                                   _DIRECTION_CODES[car.history_direction], flags, len(car.cabin)))
+            parts.extend(_CABIN.pack(floor, timestamp) for floor, timestamp in car.cabin)
+        parts.append(_COUNT.pack(len(self.calls)))
+        parts.extend(_CALL.pack(floor, _INTENT_CODES[intent], owner or 0, timestamp)
+                     for floor, intent, owner, timestamp in self.calls)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Checkpoint":
+        view = memoryview(data)
+        try:
+            magic, version, num_elevators, num_floors, policy, now = _HEADER.unpack_from(view, 0)
+        except struct.error:
+            raise ValueError("检查点文件不完整") from None
+        if magic != MAGIC:
+            raise ValueError("不是电梯检查点文件")
+        if version != VERSION:
+            raise ValueError(f"不支持的检查点版本: {version}")
+
+        offset = _HEADER.size
+        try:
+            cars = []
+            for _ in range(num_elevators):
+                floor, direction, history, flags, count = _CAR.unpack_from(view, offset)
+                offset += _CAR.size
+                cabin = [(f, t) for f, t in _CABIN.iter_unpack(view[offset:offset + count * _CABIN.size])]
+                offset += count * _CABIN.size
+                cars.append(CarState(floor, _decode(_DIRECTIONS, direction, "方向"), _decode(_DIRECTIONS, history, "方向"),
+                                     bool(flags & _DOOR_OPEN), bool(flags & _IDLE), cabin))
+            count, = _COUNT.unpack_from(view, offset)
+            offset += _COUNT.size
+            calls = [(floor, _decode(_INTENTS, intent, "呼叫方向"), owner or None, timestamp)
+                     for floor, intent, owner, timestamp in _CALL.iter_unpack(view[offset:offset + count * _CALL.size])]
+            offset += count * _CALL.size
+        except struct.error:
+            raise ValueError("检查点文件不完整") from None
+        if offset != len(data):
+            raise ValueError("检查点文件末尾有多余数据")
+        return cls(BuildingConfig(num_elevators, num_floors), _decode(_POLICIES, policy, "调度策略"),
+                   now, cars, calls)
+
+    def __repr__(self):
+        cabin = sum(len(car.cabin) for car in self.cars)
+        return (f"<Checkpoint {self.building}, policy={self.policy.name}, now={self.now:.1f}, "
+                f"cabin_calls={cabin}, hall_calls={len(self.calls)}>")
+
+
+# ========== 文件读写 ==========
+def save(checkpoint: Checkpoint, path: str):
+    """先写临时文件再原子替换，进程在写入途中退出也不会留下半个检查点"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(checkpoint.to_bytes())
+    os.replace(tmp, path)
+
+def load(path: str) -> Checkpoint:
+    with open(path, "rb") as f:
+        return Checkpoint.from_bytes(f.read())
+
+
+# ========== 离散事件仿真 ==========
+def restore_simulation(checkpoint: Checkpoint, logger: Optional[LogWriter] = None) -> Simulation:
+    """从检查点新建一个仿真，虚拟时钟从保存时刻继续；交通流需另行排入（如 traffic.replay(sim, ...)）"""
+    sim = Simulation(checkpoint.building, logger=logger, policy=checkpoint.policy, start=checkpoint.now)
+    checkpoint.apply(sim.dispatcher, sim.elevators)
+    return sim
+
+def save_simulation(sim: Simulation, path: str):
+    save(Checkpoint.capture(sim.dispatcher, sim.elevators, sim.now), path)
+
+def load_simulation(path: str, logger: Optional[LogWriter] = None) -> Simulation:
+    return restore_simulation(load(path), logger)
+
+def fork(sim: Simulation, logger: Optional[LogWriter] = None) -> Simulation:
+    """从一个已预热的仿真复制出独立的新仿真（不经过文件），用于从同一状态出发比较不同场景"""
+    return restore_simulation(Checkpoint.capture(sim.dispatcher, sim.elevators, sim.now), logger)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="预热一段交通流后保存检查点，供后续场景从该状态开始")
+    parser.add_argument("output", help="检查点文件")
+    parser.add_argument("--pattern", default="up_peak", help="预热用的交通模式")
+    parser.add_argument("--duration", type=float, default=3600.0, help="预热时长（虚拟秒）")
+    parser.add_argument("--interval", type=float, default=10.0, help="平均到达间隔（秒）")
+    parser.add_argument("--elevators", type=int, default=5)
+    parser.add_argument("--floors", type=int, default=20)
+    parser.add_argument("--policy", default="ETA", choices=[p.name for p in DispatchPolicy])
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    sim = Simulation(BuildingConfig(args.elevators, args.floors), policy=DispatchPolicy[args.policy])
+    add_traffic(sim, args.duration, args.pattern, args.interval, seed=args.seed)
+    sim.run(until=args.duration)
+    checkpoint = Checkpoint.capture(sim.dispatcher, sim.elevators, sim.now)
+    save(checkpoint, args.output)
+    print(f"{checkpoint} -> {args.output}（{os.path.getsize(args.output)} 字节）")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,104 +1,282 @@
 # dispatcher.py
+import math
 import threading
-from request import Request
+import time
+from enum import Enum
+from typing import Dict, List, Optional, Set, Tuple
+from building import BuildingConfig, DEFAULT_BUILDING
+from request import Request, UserIntent
+from request_store import RequestStore, RequestSnapshot, request_key
+
+class DispatchPolicy(Enum):
+    """
+    参数说明：
+    - SHARED: 所有电梯共享全部外部请求，谁先到谁响应（原始策略）
+    - ETA: 调度器按预计到达时间把每个外部请求分配给唯一一部电梯，并随电梯状态变化增量改派
+    - MANUAL: 分配给用户在界面上呼叫的那部电梯（该电梯停运时按 ETA 改派）
+    """
+    SHARED = "SHARED"
+    ETA = "ETA"
+    MANUAL = "MANUAL"
+
+REASSIGN_MARGIN = 5.0  # 改派的最小收益（秒），避免请求在电梯之间来回抖动
 
 class Dispatcher:
-    def __init__(self):
-        # 外部请求共享资源（临界资源）
-        self.external_requests = []
+    def __init__(self, verbose: bool = True, policy: DispatchPolicy = DispatchPolicy.SHARED,
+                 building: BuildingConfig = DEFAULT_BUILDING):
+        self.building = building    # 大楼配置，登记到本调度器的电梯共用
+        # 外部请求共享资源（临界资源），按楼层 × 方向建立索引，仅写者可修改
+        self.external_requests = RequestStore()
+        self.verbose = verbose      # 是否在控制台打印请求的添加与移除
+        self.policy = policy
+
+        # 写者之间互斥；读者不加锁，只读取最近一次发布的不可变快照
+        self.w_mutex = threading.Lock()
+        self._snapshot = self.external_requests.snapshot()
+
+        # 已登记的电梯，以及 ETA / MANUAL 策略下每部电梯被分配到的外部请求
+        self.elevators = {}                                   # elevator_id -> Elevator
+        self._assigned: Dict[int, RequestStore] = {}          # elevator_id -> 分配给它的请求
+        self._owner: Dict[int, int] = {}                      # request_key(floor, intent) -> elevator_id
+        self._car_snapshots: Dict[int, RequestSnapshot] = {}  # elevator_id -> 分配请求的快照
+
+        # 可选回调 on_remove(requests, elevator_id)：外部请求被响应后调用（在锁外），用于统计
+        self.on_remove = None
+        # 可选回调 on_add(request)：新的外部请求加入后调用（在锁外，重复的请求不调用），用于学习需求
+        self.on_add = None
+        # 可选的剖析探针（instrumentation.Probe），None 表示关闭
+        self.probe = None
+
+    def register(self, elevator):
+        """登记电梯：用于分配请求，以及有新请求时唤醒空闲电梯"""
+        with self.w_mutex:
+            self.elevators[elevator.elevator_id] = elevator
+            self._assigned[elevator.elevator_id] = RequestStore()
+            self._car_snapshots[elevator.elevator_id] = self._assigned[elevator.elevator_id].snapshot()
+
+    def _lock(self):
+        """写者加锁：挂有探针时记录 w_mutex 的等待与持有时间"""
+        probe = self.probe
+        return self.w_mutex if probe is None else probe.timed_lock(self.w_mutex)
+
+    def _notify(self, elevator_ids=None):
+        """唤醒指定电梯（默认全部）"""
+        for elevator_id in (self.elevators if elevator_ids is None else elevator_ids):
+            self.elevators[elevator_id].wake()
+
+    def _publish(self, changed: Set[int] = frozenset()):
+        """写者在持有 w_mutex 时调用：生成新快照并整体替换引用（引用赋值是原子的）"""
+        self._snapshot = self.external_requests.snapshot()
+        for elevator_id in changed:
+            self._car_snapshots[elevator_id] = self._assigned[elevator_id].snapshot()
+
+    # ========== 分配：预计到达时间（ETA）代价 ==========
+    def _car_stops(self, stores) -> Dict[int, int]:
+        """
+        每部电梯的停靠楼层位图（内部请求 | 分配给它的外部请求），一轮分配中每部电梯只计算一次。
+        stores 为 self._assigned（持有 w_mutex 时）或 self._car_snapshots（锁外，读已发布的快照）
+        """
+        return {elevator_id: elevator.stop_bits(stores[elevator_id].floor_bits())
+                for elevator_id, elevator in self.elevators.items()}
+
+    def _best_elevator(self, request: Request, stops: Dict[int, int], exclude: int = None):
+        """返回 (预计到达时间最短的电梯号, 代价)，没有可用电梯时返回 (None, inf)"""
+        best, best_cost = None, math.inf
+        for elevator_id, elevator in self.elevators.items():
+            if elevator_id == exclude:
+                continue
+            cost = elevator.estimate_arrival(request.floor, request.user_intent, stops[elevator_id])
+            if cost < best_cost:
+                best, best_cost = elevator_id, cost
+        return best, best_cost
+
+    def _place(self, request: Request, elevator_id: Optional[int]) -> Set[int]:
+        """把请求移交给 elevator_id（None 表示暂不分配），返回分配发生变化的电梯号"""
+        key = request_key(request.floor, request.user_intent)
+        owner = self._owner.get(key)
+        if owner == elevator_id:
+            return set()
+        changed = set()
+        if owner is not None:
+            self._assigned[owner].remove(request.floor, request.user_intent)
+            del self._owner[key]
+            changed.add(owner)
+        if elevator_id is not None:
+            self._assigned[elevator_id].add(request)
+            self._owner[key] = elevator_id
+            changed.add(elevator_id)
+        return changed
 
-        # 信号量（互斥 + 同步控制）
-        self.read_count = 0         # 正在读的线程数
-        self.write_count = 0        # 正在等待或进行写的线程数
+    def _assign(self, request: Request, hint: int = None) -> Set[int]:
+        if self.policy == DispatchPolicy.MANUAL and hint in self.elevators and self.elevators[hint].running:
+            return self._place(request, hint)
+        best, _ = self._best_elevator(request, self._car_stops(self._assigned))
+        return self._place(request, best)
 
-        # 同步与互斥信号量
-        self.r_mutex = threading.Lock()     # 保护 read_count 修改
-        self.w_mutex = threading.Lock()     # 保护 write_count 修改
-        self.read_try = threading.Semaphore(1)  # 写者优先策略入口：新读者先抢票需判断写者是否在等
-        self.resource = threading.Semaphore(1)  # 控制对共享数据的访问权限
+    def _plan_rebalance(self, elevator_id: int) -> List[Tuple[Request, Optional[int], int]]:
+        """
+        电梯 elevator_id 停靠后（状态变化）的增量改派方案，在锁外按已发布的快照计算：
+        - 它自己的请求、未分配的请求和停运电梯的请求：在所有电梯中重新比较
+        - 其它电梯的请求：只比较它与原负责电梯，它快出 REASSIGN_MARGIN 以上才改派给它
+        返回 [(请求, 计算时的负责电梯, 新的负责电梯)]，由 _apply_moves 在锁内核对后执行
+        """
+        stops = self._car_stops(self._car_snapshots)
+        car = self.elevators.get(elevator_id)
+        moves = []
+        for request in self._snapshot.requests:
+            floor, intent = request.floor, request.user_intent
+            owner = self._owner.get(request_key(floor, intent))
+            owner_car = self.elevators[owner] if owner is not None else None
+            if owner_car is not None and owner_car.running:
+                if self.policy == DispatchPolicy.MANUAL:
+                    continue  # 尊重用户的选择
+                if owner != elevator_id:
+                    if car is None:
+                        continue
+                    best, cost = elevator_id, car.estimate_arrival(floor, intent, stops[elevator_id])
+                else:
+                    best, cost = self._best_elevator(request, stops)
+            else:
+                best, cost = self._best_elevator(request, stops)
+            if best is None or best == owner:
+                continue
+            if owner_car is not None and cost > owner_car.estimate_arrival(floor, intent, stops[owner]) - REASSIGN_MARGIN:
+                continue
+            moves.append((request, owner, best))
+            stops[best] |= 1 << floor
+        return moves
+
+    def _apply_moves(self, moves) -> Set[int]:
+        """持有 w_mutex 时调用：执行改派方案，跳过计算之后已被响应、已改派或被新请求替换的请求"""
+        changed = set()
+        for request, owner, best in moves:
+            if (self.external_requests.get(request.floor, request.user_intent) is not request
+                    or self._owner.get(request_key(request.floor, request.user_intent)) != owner):
+                continue
+            changed |= self._place(request, best)
+        return changed
+
+    def release(self, elevator_id: int):
+        """电梯停止运行：把分配给它的请求改派给其它电梯"""
+        if self.policy == DispatchPolicy.SHARED or elevator_id not in self._assigned:
+            return
+        changed = set()
+        with self._lock():
+            stops = self._car_stops(self._assigned)
+            for request in list(self._assigned[elevator_id]):
+                best, _ = self._best_elevator(request, stops, exclude=elevator_id)
+                changed |= self._place(request, best)
+                if best is not None:
+                    stops[best] |= 1 << request.floor
+            if changed:
+                self._publish(changed)
+        self._notify(changed - {elevator_id})
 
     # ========== 写者行为：添加外部请求 ==========
-    def add_request(self, request: Request):
-        """写者行为：向共享 external_requests 添加一个外部请求"""
-        # 写者优先策略：修改 write_count，决定是否加锁 resource
-        self.w_mutex.acquire()
-        self.write_count += 1
-        if self.write_count == 1:
-            self.read_try.acquire()  # 阻止新读者进入
-        self.w_mutex.release()
-
-        # 写者进入资源区
-        self.resource.acquire()
-        # --- 临界区 ---
-        duplicate = any(
-            req.floor == request.floor and 
-            req.request_type == request.request_type and 
-            req.user_intent == request.user_intent
-            for req in self.external_requests
-        )
-        if not duplicate:
-            self.external_requests.append(request)
-            print(f"[Dispatcher] 添加外部请求: {request}")
-        # --- 临界区结束 ---
-        self.resource.release()
-
-        # 写者退出
-        self.w_mutex.acquire()
-        self.write_count -= 1
-        if self.write_count == 0:
-            self.read_try.release()  # 没有写者了，允许读者进入
-        self.w_mutex.release()
-
-    # ========== 读者行为：电梯读取共享请求 ==========
-    def get_requests(self):
-        """读者行为：返回外部请求的当前快照，电梯读取请求时调用"""
-        # 写者优先控制：先尝试进入 read_try 信号量
-        self.read_try.acquire()
-        self.r_mutex.acquire()
-        self.read_count += 1
-        if self.read_count == 1:
-            self.resource.acquire()  # 第一个读者锁定资源，防止写者进入
-        self.r_mutex.release()
-        self.read_try.release()
-
-        # --- 临界区：读取共享数据 ---
-        snapshot = list(self.external_requests)
-        # --- 临界区结束 ---
-
-        # 离开临界区
-        self.r_mutex.acquire()
-        self.read_count -= 1
-        if self.read_count == 0:
-            self.resource.release()  # 最后一个读者释放锁
-        self.r_mutex.release()
-
-        return snapshot
+    def add_request(self, request: Request, elevator_id: int = None):
+        """写者行为：向共享 external_requests 添加一个外部请求（elevator_id 为用户呼叫的电梯，仅 MANUAL 策略使用）"""
+        if not self.building.has_floor(request.floor):
+            raise ValueError(f"请求楼层超出范围 1..{self.building.num_floors}: {request}")
+        changed = None
+        with self._lock():
+            # --- 临界区：索引去重 O(1) ---
+            added = self.external_requests.add(request)
+            if added:
+                if self.policy != DispatchPolicy.SHARED:
+                    changed = self._assign(request, elevator_id)
+                self._publish(changed or set())
+                if self.verbose:
+                    print(f"[Dispatcher] 添加外部请求: {request}")
+            # --- 临界区结束 ---
+
+        if added:
+            if self.on_add is not None:
+                self.on_add(request)
+            self._notify(changed)  # 立即唤醒空闲电梯（分配策略下只唤醒被分配的电梯）
+
+    # ========== 读者行为：电梯读取共享请求（无锁） ==========
+    def snapshot(self, elevator_id: int = None) -> RequestSnapshot:
+        """
+        读者行为：返回当前不可变快照（发布后不再修改，可不加锁地反复读取）。
+        分配策略下传入 elevator_id 只返回分配给该电梯的请求
+        """
+        if elevator_id is None or self.policy == DispatchPolicy.SHARED:
+            return self._snapshot
+        return self._car_snapshots[elevator_id]
+
+    def get_requests(self, elevator_id: int = None) -> Tuple[Request, ...]:
+        """读者行为：返回外部请求的当前快照（不可变元组，无需复制）"""
+        return self.snapshot(elevator_id).requests
+
+    def has_requests(self, elevator_id: int = None) -> bool:
+        """读者行为：是否存在外部请求"""
+        return len(self.snapshot(elevator_id)) > 0
+
+    def has_request_at(self, floor: int, elevator_id: int = None) -> bool:
+        """读者行为：指定楼层是否有外部请求"""
+        return self.snapshot(elevator_id).has_floor(floor)
+
+    def nearest_above(self, floor: int, elevator_id: int = None) -> Optional[int]:
+        """读者行为：严格高于 floor 的最近外部请求楼层，O(1) 位运算"""
+        return self.snapshot(elevator_id).nearest_above(floor)
+
+    def nearest_below(self, floor: int, elevator_id: int = None) -> Optional[int]:
+        """读者行为：严格低于 floor 的最近外部请求楼层，O(1) 位运算"""
+        return self.snapshot(elevator_id).nearest_below(floor)
+
+    def owner(self, floor: int, intent: UserIntent) -> Optional[int]:
+        """分配策略下负责 (floor, intent) 外部请求的电梯号，未分配或 SHARED 策略时为 None"""
+        return self._owner.get(request_key(floor, intent))
 
     # ========== 写者行为：移除完成的请求 ==========
-    def remove_request(self, floor: int, elevator_id: int) -> bool:
-        """写者行为：移除指定楼层的请求，如果成功则返回 True"""
-        self.w_mutex.acquire()
-        self.write_count += 1
-        if self.write_count == 1:
-            self.read_try.acquire()
-        self.w_mutex.release()
-
-        self.resource.acquire()
-        # --- 临界区 ---
-        initial_len = len(self.external_requests)
-        self.external_requests = [
-            req for req in self.external_requests if req.floor != floor
-        ]
-        removed = len(self.external_requests) < initial_len
-        if removed:
-            print(f"[Dispatcher] 电梯 {elevator_id} 移除并响应了楼层 {floor} 的外部请求")
-        # --- 临界区结束 ---
-        self.resource.release()
-
-        self.w_mutex.acquire()
-        self.write_count -= 1
-        if self.write_count == 0:
-            self.read_try.release()
-        self.w_mutex.release()
-
-        return removed  # 如果确实响应了外部请求，返回 True
\ No newline at end of file
+    def remove_request(self, floor: int, elevator_id: int, intent: UserIntent = None) -> bool:
+        """
+        写者行为：移除指定楼层的请求（intent 不为空时只移除该方向的请求），如果成功则返回 True。
+        intent 为空（空闲电梯在本层开门）时，分配策略下只移除未分配或分配给 elevator_id 的请求，
+        分配给其它电梯的请求仍由原电梯响应
+        """
+        changed = set()
+        probe = self.probe
+        with self._lock():
+            # --- 临界区：按楼层（× 方向）索引直接删除 ---
+            if intent is None and self.policy == DispatchPolicy.SHARED:
+                removed = self.external_requests.remove_floor(floor)
+            elif intent is None:
+                removed = []
+                for each in (UserIntent.UP, UserIntent.DOWN):
+                    if self._owner.get(request_key(floor, each)) in (None, elevator_id):
+                        request = self.external_requests.remove(floor, each)
+                        if request is not None:
+                            removed.append(request)
+            else:
+                request = self.external_requests.remove(floor, intent)
+                removed = [request] if request is not None else []
+            if self.policy != DispatchPolicy.SHARED:
+                for request in removed:
+                    changed |= self._place(request, None)
+            if removed or changed:
+                self._publish(changed)
+            if removed and self.verbose:
+                print(f"[Dispatcher] 电梯 {elevator_id} 移除并响应了楼层 {floor} 的外部请求")
+            # --- 临界区结束 ---
+
+        if self.policy != DispatchPolicy.SHARED:
+            # 电梯每次停靠都是一次状态变化，借此增量改派：锁外计算，加锁只执行有变化的改派
+            start = time.perf_counter() if probe is not None else 0.0
+            moves = self._plan_rebalance(elevator_id)
+            if probe is not None:
+                probe.record("rebalance", time.perf_counter() - start)
+            if moves:
+                with self._lock():
+                    moved = self._apply_moves(moves)
+                    if moved:
+                        self._publish(moved)
+                changed |= moved
+
+        if probe is not None and removed:
+            probe.count("served", len(removed))
+        if changed:
+            self._notify(changed)
+        if removed and self.on_remove is not None:
+            self.on_remove(removed, elevator_id)
+        return bool(removed)  # 如果确实响应了外部请求，返回 True
@@ -1,13 +1,29 @@
 #elevator.py
+import math
 import time
 import threading
-from typing import List
-from request import Direction, RequestType, Request
+from typing import Optional
+from request import Direction, RequestType, UserIntent, Request
 from dispatcher import Dispatcher
-from gui.elevator_state import state_manager
+from request_store import CabinRequests
+from log_writer import LogWriter, event_log
+
+# 动作耗时（秒）：实时线程模式下真实休眠，离散事件仿真中推进虚拟时钟
+MOVE_TIME = 1           # 移动一层
+DOOR_TIME = 1.2         # 开门或关门
+TICK_INTERVAL = 0.5     # 两次调度之间的间隔
+
+def _lowest_floor(bits: int) -> int:
+    """位图中最低的楼层"""
+    return (bits & -bits).bit_length() - 1
+
+def _highest_floor(bits: int) -> int:
+    """位图中最高的楼层"""
+    return bits.bit_length() - 1
 
 class Elevator(threading.Thread):
-    def __init__(self, elevator_id: int, dispatcher: Dispatcher):
+    def __init__(self, elevator_id: int, dispatcher: Dispatcher, logger: Optional[LogWriter] = event_log,
+                 observer=None):
         """
         参数说明：
         - elevator_id: 电梯号
@@ -16,9 +32,18 @@ class Elevator(threading.Thread):
         - history_direction: 上一次电梯运行方向（与当前不同）
         - door_open: 电梯门是否打开
         - was_idle: 电梯是否空闲
-        - internal_requests: 电梯的内部请求池
+        - internal_requests: 电梯的内部请求池（楼层位图，与界面内部按钮同步）
         - dispatcher: 传入的调度器实例
+        - building: 大楼配置，与调度器共用同一份
         - running: 电梯是否正在运行
+        - logger: 异步日志写入器，None 表示不写日志（无界面仿真）
+        - wakeup: 唤醒事件，空闲电梯阻塞等待，新请求到达或停止运行时被 set
+        - on_wake: 可选的唤醒回调（离散事件仿真用它重新排程空闲电梯）
+        - on_remove: 可选回调 (requests, elevator_id)，内部请求被响应后调用，用于统计
+        - probe: 可选的剖析探针（instrumentation.Probe），None 表示关闭
+        - parking: 可选的空闲停靠策略（如 parking.DemandParking），提供 park_floor(elevator)；None 表示原地等候
+        - observer: 可选的状态观察者（如界面的 state_manager），需提供 update_elevator 与 set_internal_button；
+          None 表示无界面运行，电梯核心不依赖 gui 包
         """
         super().__init__()
         self.elevator_id = elevator_id
@@ -27,160 +52,337 @@ class Elevator(threading.Thread):
         self.history_direction = Direction.NONE
         self.door_open = False
         self.was_idle = False
-        self.internal_requests: List[Request] = []
+        self.internal_requests = CabinRequests()
         self.dispatcher = dispatcher
+        self.building = dispatcher.building
         self.running = True
+        self.logger = logger
+        self.wakeup = threading.Event()
+        self.on_wake = None
+        self.on_remove = None
+        self.probe = None
+        self.parking = None
+        self.observer = observer
+        dispatcher.register(self)
 
         # 初始状态推送
-        state_manager.update_elevator(self.elevator_id, self.current_floor, self.direction, self.door_open)
+        self._push_state()
 
     def add_request(self, request: Request):
         # 统一接口，区分内部和外部请求处理
+        if not self.building.has_floor(request.floor):
+            raise ValueError(f"请求楼层超出范围 1..{self.building.num_floors}: {request}")
         if request.request_type == RequestType.INTERNAL:
-            if request.floor not in [r.floor for r in self.internal_requests]:
-                self.internal_requests.append(request)
+            if self.internal_requests.add(request):
+                if self.observer is not None:
+                    self.observer.set_internal_button(self.elevator_id, request.floor, True)
+                self.wake()
         elif request.request_type == RequestType.EXTERNAL:
-            self.dispatcher.add_request(request)
+            self.dispatcher.add_request(request, self.elevator_id)
+
+    def restore_state(self, floor: int, direction: Direction, history_direction: Direction,
+                      door_open: bool, was_idle: bool):
+        """从检查点恢复运行状态（在电梯开始运行之前调用），内部请求另由 add_request 恢复"""
+        if not self.building.has_floor(floor):
+            raise ValueError(f"楼层超出范围 1..{self.building.num_floors}: {floor}")
+        self.current_floor = floor
+        self.direction = direction
+        self.history_direction = history_direction
+        self.door_open = door_open
+        self.was_idle = was_idle
+        self._push_state()
+
+    def wake(self):
+        """唤醒空闲电梯：线程模式 set 事件，仿真模式通过 on_wake 回调重新排程"""
+        self.wakeup.set()
+        if self.on_wake is not None:
+            self.on_wake(self)
 
     def run(self):
         while self.running:
+            self.wakeup.clear()  # 先清除再检查请求，避免丢失检查期间到达的唤醒
             self.move()
-            time.sleep(0.5)
+            if self.was_idle:
+                self.wakeup.wait()  # 空闲时阻塞，不占用 CPU，有新请求立即唤醒
+            else:
+                time.sleep(TICK_INTERVAL)
 
-    def stop(self):
+    def stop(self, release: bool = True):
+        """
+        停止运行。release 为 True 时（报警等单部电梯停运）把分配给本电梯的外部请求改派给其它电梯；
+        整个程序退出时传 False，保留原来的分配，供检查点保存
+        """
         self.direction = Direction.NONE
         self.running = False
-        state_manager.update_elevator(self.elevator_id, self.current_floor, self.direction, self.door_open)
+        self.wake()  # 唤醒阻塞中的线程或挂起的协程，使其退出
+        if release:
+            self.dispatcher.release(self.elevator_id)  # 分配给本电梯的外部请求改派给其它电梯
+        self._push_state()
 
     def sos(self):
         if self.running:
             self.stop()
-            with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-                logf.write(f"[报警响应] 电梯 {self.elevator_id} 已停止运行\n")
+            self.log(f"[报警响应] 电梯 {self.elevator_id} 已停止运行", "sos")
 
     def remove_handled_requests(self, floor: int):
-        self.internal_requests = [r for r in self.internal_requests if r.floor != floor]
+        served = self.internal_requests.remove(floor)
+        if served is not None:
+            if self.observer is not None:
+                self.observer.set_internal_button(self.elevator_id, floor, False)  # 熄灭界面上的楼层按钮
+            if self.on_remove is not None:
+                self.on_remove([served], self.elevator_id)
 
-        responded = self.dispatcher.remove_request(floor, self.elevator_id)
+        # 只响应与运行方向一致的外部请求，反向的留待折返时响应；空闲电梯响应本层全部请求
+        intent = None if self.direction == Direction.NONE else UserIntent(self.direction.value)
+        responded = self.dispatcher.remove_request(floor, self.elevator_id, intent)
         if responded:
-            with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-                logf.write(f"[电梯 {self.elevator_id}] 外部请求已响应于楼层 {floor}\n")
+            if self.observer is not None:
+                # 熄灭界面上已响应的外部按钮：空闲电梯可能响应本层两个方向（分配给其它电梯的除外），运行中只响应同向的
+                pending = self.dispatcher.snapshot()
+                for cleared in (UserIntent.UP, UserIntent.DOWN) if intent is None else (intent,):
+                    if not pending.has_floor(floor, cleared):
+                        self.observer.set_external_button(floor, cleared, False)
+            self.log(f"[电梯 {self.elevator_id}] 外部请求已响应于楼层 {floor}", "serve")
             #print(f"[电梯 {self.elevator_id}] 外部请求已响应于楼层 {floor}")
 
-    def get_all_requests(self):
-        external_requests = self.dispatcher.get_requests()
-        return self.internal_requests + external_requests
-
     def has_pending_requests(self):
-        return len(self.get_all_requests()) > 0
+        return bool(self.internal_requests) or self.dispatcher.has_requests(self.elevator_id)
+
+    def stop_bits(self, hall_bits: int = 0) -> int:
+        """途中要停靠的楼层位图：内部请求 | hall_bits（已分配给本电梯的外部请求）"""
+        return hall_bits | self.internal_requests.bits
+
+    def estimate_arrival(self, floor: int, intent: UserIntent, stops: int = 0) -> float:
+        """
+        估算本电梯到达 floor 并按 intent 方向接客所需的时间（秒），供调度器分配外部请求。
+        按扫描路线估算：先沿当前方向走到最远的停靠点，再折返；
+        stops 为 stop_bits() 给出的停靠楼层位图，途经的停靠点数是一次掩码与计数，不构造楼层集合
+        """
+        if not self.running:
+            return math.inf
+
+        stops &= ~(1 << floor)
+        current = self.current_floor
+        direction = self.direction
+        if direction == Direction.NONE:
+            direction = Direction.UP if floor >= current else Direction.DOWN
+        top = max(current, _highest_floor(stops))
+        bottom = min(current, _lowest_floor(stops)) if stops else current
+
+        if direction == Direction.UP:
+            if intent == UserIntent.UP and floor >= current:
+                # 顺路：直接上行到达，途经 current < s < floor
+                distance = floor - current
+                passed = stops & ((1 << floor) - 1) & ~((2 << current) - 1)
+            elif intent == UserIntent.DOWN:
+                # 反向：上行到最高点后折返到达，途经高于 min(current, floor) 的停靠点
+                top = max(top, floor)
+                distance = (top - current) + (top - floor)
+                passed = stops & ~((2 << min(current, floor)) - 1)
+            else:
+                # 同向但已错过：上行到顶、下行到底，再上行到达
+                bottom = min(bottom, floor)
+                distance = (top - current) + (top - bottom) + (floor - bottom)
+                passed = stops
+        else:
+            if intent == UserIntent.DOWN and floor <= current:
+                distance = current - floor
+                passed = stops & ((1 << current) - 1) & ~((2 << floor) - 1)
+            elif intent == UserIntent.UP:
+                bottom = min(bottom, floor)
+                distance = (current - bottom) + (floor - bottom)
+                passed = stops & ((1 << max(current, floor)) - 1)
+            else:
+                top = max(top, floor)
+                distance = (current - bottom) + (top - bottom) + (top - floor)
+                passed = stops
+
+        return distance * (MOVE_TIME + TICK_INTERVAL) + passed.bit_count() * (2 * DOOR_TIME + TICK_INTERVAL)
+
+    def _earliest_request(self, snapshot) -> Request:
+        """最早发出的请求（内部优先于同一时刻的外部请求），只在空闲电梯确定出发方向时调用"""
+        earliest = None
+        for request in self.internal_requests:
+            if earliest is None or request.timestamp < earliest.timestamp:
+                earliest = request
+        for request in snapshot.requests:
+            if earliest is None or request.timestamp < earliest.timestamp:
+                earliest = request
+        return earliest
 
     def next_stop(self):
-        if not self.has_pending_requests(): # 当前没有请求
+        """
+        LOOK 扫描选择下一个停靠楼层。内部请求与外部上/下行请求各是一个楼层位图（第 k 位表示 k 层），
+        "本层有无请求 / 楼上最近 / 楼下最近 / 最远的反向请求" 都是一次位运算，每次决策不再构造请求列表
+        """
+        snapshot = self.dispatcher.snapshot(self.elevator_id)
+        cabin = self.internal_requests.bits
+        stops_up = cabin | snapshot.up_bits        # 上行途中需要停靠的楼层
+        stops_down = cabin | snapshot.down_bits    # 下行途中需要停靠的楼层
+        every = stops_up | stops_down
+
+        if not every: # 当前没有请求
             self.history_direction = self.direction # 记录历史方向
             self.direction = Direction.NONE # 置为空闲状态
             return None
 
-        requests = self.get_all_requests()
-        current_requests = [r for r in requests if r.floor == self.current_floor]
-        if current_requests:
-            return self.current_floor
+        floor = self.current_floor
+        here = 1 << floor
+        below = here - 1           # 低于本层的所有楼层
+        above = ~(below | here)    # 高于本层的所有楼层
 
-        if self.direction == Direction.UP: # 当前是上行
-            ups = [r for r in requests if r.floor > self.current_floor]
-            if ups: # 楼上有请求
-                return min(ups, key=lambda r: r.floor).floor # 去最近的楼
-            downs = [r for r in requests if r.floor < self.current_floor]
-            if downs: # 楼上没有，楼下有
-                self.direction = Direction.DOWN # 改方向
-                return max(downs, key=lambda r: r.floor).floor # 去最近的楼
-
-        elif self.direction == Direction.DOWN:
-            downs = [r for r in requests if r.floor < self.current_floor]
-            if downs:
-                return max(downs, key=lambda r: r.floor).floor
-            ups = [r for r in requests if r.floor > self.current_floor]
-            if ups:
-                self.direction = Direction.UP
-                return min(ups, key=lambda r: r.floor).floor
-
-        elif self.direction == Direction.NONE:
-            if self.history_direction == Direction.UP:
-                ups = [r for r in requests if r.floor > self.current_floor]
-                if ups:
-                    self.direction = Direction.UP
-                    return min(ups, key=lambda r: r.floor).floor
-            elif self.history_direction == Direction.DOWN:
-                downs = [r for r in requests if r.floor < self.current_floor]
-                if downs:
-                    self.direction = Direction.DOWN
-                    return max(downs, key=lambda r: r.floor).floor
-
-            earliest = min(requests, key=lambda r: r.timestamp)
-            if earliest.floor > self.current_floor:
+        if self.direction == Direction.NONE: # 空闲：先确定方向
+            if every & here: # 本层有请求，直接响应
+                return floor
+            if self.history_direction == Direction.UP and every & above:
                 self.direction = Direction.UP
-                ups = [r for r in requests if r.floor > self.current_floor]
-                return min(ups, key=lambda r: r.floor).floor
-            elif earliest.floor < self.current_floor:
+            elif self.history_direction == Direction.DOWN and every & below:
                 self.direction = Direction.DOWN
-                downs = [r for r in requests if r.floor < self.current_floor]
-                return max(downs, key=lambda r: r.floor).floor
-            else:
-                self.direction = Direction.NONE
-                return None
+            else: # 朝最早发出的请求出发
+                earliest = self._earliest_request(snapshot)
+                self.direction = Direction.UP if earliest.floor > floor else Direction.DOWN
+
+        if self.direction == Direction.UP: # 当前是上行
+            if stops_up & here:
+                return floor # 本层有内部请求或上行呼叫
+            if every & above: # 楼上有请求：最近的顺路楼层，楼上只有下行呼叫时先到最高的那一层
+                serving = stops_up & above
+                return _lowest_floor(serving) if serving else _highest_floor(every & above)
+            self.direction = Direction.DOWN # 楼上没有请求，折返
+            if every & here: # 本层的下行请求
+                return floor
+            serving = stops_down & below
+            return _highest_floor(serving) if serving else _lowest_floor(every & below)
 
-        return None
+        else: # 当前是下行
+            if stops_down & here:
+                return floor
+            if every & below:
+                serving = stops_down & below
+                return _highest_floor(serving) if serving else _lowest_floor(every & below)
+            self.direction = Direction.UP
+            if every & here:
+                return floor
+            serving = stops_up & above
+            return _lowest_floor(serving) if serving else _highest_floor(every & above)
 
     def move(self):
+        """实时模式：执行一步调度，并按真实时间休眠"""
+        probe = self.probe
+        if probe is None:
+            for delay in self.step():
+                time.sleep(delay)
+            return
+
+        # 剖析：分别统计调度计算时间与休眠时间
+        step = self.step()
+        while True:
+            start = time.perf_counter()
+            delay = next(step, None)
+            probe.record("compute", time.perf_counter() - start)
+            if delay is None:
+                return
+            start = time.perf_counter()
+            time.sleep(delay)
+            probe.record("sleep", time.perf_counter() - start)
+
+    def step(self):
+        """
+        单步调度逻辑（生成器）：每遇到一段耗时动作就 yield 其时长（秒），
+        由运行时决定是真实休眠（线程）还是推进虚拟时钟（离散事件仿真）
+        """
         if not self.has_pending_requests():
+            park_floor = self.parking.park_floor(self) if self.parking is not None else None
+            if park_floor is not None and park_floor != self.current_floor:
+                self.was_idle = False
+                yield from self.park_steps(park_floor)
+                return
             self.direction = Direction.NONE
             if not self.was_idle:
-                with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-                    logf.write(f"[电梯 {self.elevator_id}] 空闲于 {self.current_floor} 层\n")
+                self.log(f"[电梯 {self.elevator_id}] 空闲于 {self.current_floor} 层", "idle")
                 #print(f"[电梯 {self.elevator_id}] 空闲于 {self.current_floor} 层")
                 self.was_idle = True
-                state_manager.update_elevator(self.elevator_id, self.current_floor, self.direction, self.door_open)
+                self._push_state()
             return
         else:
             self.was_idle = False
 
-        target_floor = self.next_stop()
+        probe = self.probe
+        if probe is None:
+            target_floor = self.next_stop()
+        else:
+            start = time.perf_counter()
+            target_floor = self.next_stop()
+            probe.record("next_stop", time.perf_counter() - start)
         if target_floor is None:
             return
 
         if self.current_floor == target_floor:
             if not self.door_open:
-                self.open_door()
+                yield from self.open_door_steps()
             self.remove_handled_requests(self.current_floor)
-            self.close_door()
+            yield from self.close_door_steps()
             return
 
         if self.door_open:
-            self.close_door()
+            yield from self.close_door_steps()
         
         if self.current_floor < target_floor:
             self.current_floor += 1
         elif self.current_floor > target_floor:
             self.current_floor -= 1
 
-        with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-            logf.write(f"[电梯 {self.elevator_id}] 正在移动至第 {self.current_floor} 层\n")
+        self.log(f"[电梯 {self.elevator_id}] 正在移动至第 {self.current_floor} 层", "move")
         #print(f"[电梯 {self.elevator_id}] 正在移动至第 {self.current_floor} 层")
 
-        state_manager.update_elevator(self.elevator_id, self.current_floor, self.direction, self.door_open)
-        time.sleep(1)
+        self._push_state()
+        yield MOVE_TIME
+
+    def park_steps(self, park_floor: int):
+        """空闲时朝停靠楼层移动一层（不开门），途中有新请求时下一步即按正常调度响应"""
+        if self.door_open:
+            yield from self.close_door_steps()
+        self.direction = Direction.UP if park_floor > self.current_floor else Direction.DOWN
+        self.current_floor += 1 if self.direction == Direction.UP else -1
+        self.log(f"[电梯 {self.elevator_id}] 空闲调度：前往 {park_floor} 层等候，经过第 {self.current_floor} 层", "park")
+        self._push_state()
+        yield MOVE_TIME
 
     def open_door(self):
+        for delay in self.open_door_steps():
+            time.sleep(delay)
+
+    def close_door(self):
+        for delay in self.close_door_steps():
+            time.sleep(delay)
+
+    def open_door_steps(self):
         self.door_open = True
-        with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-            logf.write(f"[电梯 {self.elevator_id}] 开门（楼层 {self.current_floor}）\n")
+        self.log(f"[电梯 {self.elevator_id}] 开门（楼层 {self.current_floor}）", "door_open")
         #print(f"[电梯 {self.elevator_id}] 开门（楼层 {self.current_floor}）")
-        state_manager.update_elevator(self.elevator_id, self.current_floor, self.direction, self.door_open)
-        time.sleep(1.2)
+        self._push_state()
+        yield DOOR_TIME
 
-    def close_door(self):
-        with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-            logf.write(f"[电梯 {self.elevator_id}] 关门\n")
+    def close_door_steps(self):
+        self.log(f"[电梯 {self.elevator_id}] 关门", "door_close")
         #print(f"[电梯 {self.elevator_id}] 关门")
-        time.sleep(1.2)
+        yield DOOR_TIME
         self.door_open = False
-        state_manager.update_elevator(self.elevator_id, self.current_floor, self.direction, self.door_open)
\ No newline at end of file
+        self._push_state()
+
+    def _push_state(self):
+        """把楼层 / 方向 / 门状态推送给观察者，无界面运行时什么也不做"""
+        if self.observer is not None:
+            self.observer.update_elevator(self.elevator_id, self.current_floor, self.direction, self.door_open)
+
+    def log(self, message: str, event: str):
+        # 只入队，由后台线程批量写文件，移动路径上不再有文件 IO
+        if self.logger is None:
+            return
+        probe = self.probe
+        if probe is None:
+            self.logger.write(message, event=event, elevator=self.elevator_id, floor=self.current_floor)
+        else:
+            start = time.perf_counter()
+            self.logger.write(message, event=event, elevator=self.elevator_id, floor=self.current_floor)
+            probe.record("log", time.perf_counter() - start)
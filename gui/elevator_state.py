@@ -1,42 +1,227 @@
 # gui/elevator_state.py
-from typing import Dict, List
+import threading
+from array import array
+from typing import Dict, Optional
+from building import BuildingConfig, DEFAULT_BUILDING
 from request import Direction, RequestType, UserIntent, Request
 
-NUM_ELEVATORS = 5
-NUM_FLOORS = 20
+_DIRECTIONS = (Direction.NONE, Direction.UP, Direction.DOWN)
+_DIRECTION_CODES = {d: i for i, d in enumerate(_DIRECTIONS)}
+
+STRIPES = 16           # 写锁分段数：电梯 eid 使用第 (eid - 1) % STRIPES 把锁
+SNAPSHOT_RETRIES = 8   # 乐观读失败的重试次数，超过后改为加锁读取
 
 class ElevatorStateManager:
-    def __init__(self):
-        self.states = {
-            eid: {
-                "floor": 1,
-                "direction": Direction.NONE,
-                "door_open": False,
-                "internal_buttons": set()
-            } for eid in range(1, NUM_ELEVATORS + 1)
-        }
-        self.external_buttons: Dict[int, Dict[str, bool]] = {
-            floor: {"UP": False, "DOWN": False} for floor in range(1, NUM_FLOORS + 1)
-        }
+    """
+    电梯状态集中管理，按电梯号下标存放在紧凑数组中（第 eid - 1 个元素）：
+    - floors: 当前楼层
+    - directions: 运行方向编码（_DIRECTIONS 的下标）
+    - doors: 门是否打开（0 / 1）
+    - internal_bits: 内部按钮楼层位图，第 k 位为 1 表示 k 层按钮亮起
+    - up_bits / down_bits: 外部上/下行按钮楼层位图
+    百层楼、数十部电梯也只占几百字节，不再为每层每部电梯建字典。
+
+    同步（顺序锁 seqlock + 分段写锁，没有全局锁）：
+    - 写者：同一分段锁下的写者互斥，外部按钮单独一把锁；
+      写入前后各把该电梯的序号 seqs[i]（外部按钮为 hall_seq）加一，写入期间序号为奇数
+    - 读者：不加锁，先记下序号、复制数据、再核对序号；期间无写入（序号未变且为偶数）即得到一致的时间点快照，
+      否则重试，多次失败后才获取全部分段锁
+    - 变化检测：序号同时是每部电梯的版本号，读者保存上次看到的序号（令牌），比较即可得知哪些电梯变化；
+      状态未变的重复写入不改变序号
+    """
+    def __init__(self, building: BuildingConfig = DEFAULT_BUILDING):
+        self._stripes = [threading.Lock() for _ in range(STRIPES)]
+        self._hall_lock = threading.Lock()
+        self._changed = threading.Condition()  # 有界面会话等待时，写者通过它唤醒
+        self._waiting = 0                      # 正在等待变化的会话数
+        self._seqs = array("Q")
+        self.hall_seq = 0
+        self.configure(building)
+
+    def _all_locks(self):
+        return [*self._stripes, self._hall_lock]
 
+    def configure(self, building: BuildingConfig):
+        """按大楼配置重新分配状态（所有电梯回到 1 层、按钮熄灭）"""
+        locks = self._all_locks()
+        for lock in locks:
+            lock.acquire()
+        try:
+            self.building = building
+            n = building.num_elevators
+            # 序号不清零而是整体前移，旧令牌与新状态比较时必然判定为变化
+            base = max(self._seqs, default=0) + 2
+            self._seqs = array("Q", [base] * n)
+            self.floors = array("H", [1] * n)
+            self.directions = array("B", [0] * n)
+            self.doors = bytearray(n)
+            self.internal_bits = [0] * n
+            self.up_bits = 0
+            self.down_bits = 0
+            self.hall_seq += 2
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        self._notify()
+
+    def _slot(self, eid: int) -> int:
+        # 无界面仿真可能不经 configure 直接创建更多电梯，按需扩容（持有全部锁，只在首次出现新电梯时发生）
+        index = eid - 1
+        if index >= len(self._seqs):
+            locks = self._all_locks()
+            for lock in locks:
+                lock.acquire()
+            try:
+                missing = index + 1 - len(self._seqs)
+                if missing > 0:
+                    self._seqs.extend([0] * missing)
+                    self.floors.extend([1] * missing)
+                    self.directions.extend([0] * missing)
+                    self.doors.extend(bytes(missing))
+                    self.internal_bits.extend([0] * missing)
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+        return index
+
+    def _notify(self):
+        # 写者先完成写入再检查 _waiting，等待者先登记再检查序号，二者至少有一方能看到对方
+        if self._waiting:
+            with self._changed:
+                self._changed.notify_all()
+
+    # ========== 写者行为 ==========
     def update_elevator(self, eid: int, floor: int, direction: Direction, door_open: bool):
-        self.states[eid]["floor"] = floor
-        self.states[eid]["direction"] = direction
-        self.states[eid]["door_open"] = door_open
+        i = self._slot(eid)
+        code = _DIRECTION_CODES[direction]
+        with self._stripes[i % STRIPES]:
+            if self.floors[i] == floor and self.directions[i] == code and self.doors[i] == door_open:
+                return
+            self._seqs[i] += 1
+            self.floors[i] = floor
+            self.directions[i] = code
+            self.doors[i] = door_open
+            self._seqs[i] += 1
+        self._notify()
 
     def set_internal_button(self, eid: int, floor: int, active: bool):
-        if active:
-            self.states[eid]["internal_buttons"].add(floor)
-        else:
-            self.states[eid]["internal_buttons"].discard(floor)
+        i = self._slot(eid)
+        with self._stripes[i % STRIPES]:
+            bits = self.internal_bits[i] | 1 << floor if active else self.internal_bits[i] & ~(1 << floor)
+            if bits == self.internal_bits[i]:
+                return
+            self._seqs[i] += 1
+            self.internal_bits[i] = bits
+            self._seqs[i] += 1
+        self._notify()
 
     def set_external_button(self, floor: int, intent: UserIntent, active: bool):
-        self.external_buttons[floor][intent.value] = active
+        mask = 1 << floor
+        with self._hall_lock:
+            old = self.up_bits if intent == UserIntent.UP else self.down_bits
+            bits = old | mask if active else old & ~mask
+            if bits == old:
+                return
+            self.hall_seq += 1
+            if intent == UserIntent.UP:
+                self.up_bits = bits
+            else:
+                self.down_bits = bits
+            self.hall_seq += 1
+        self._notify()
+
+    # ========== 读者行为（乐观读，无锁） ==========
+    def _read_car(self, i: int):
+        """一部电梯的一致状态：(floor, direction_code, door, internal_bits)"""
+        for _ in range(SNAPSHOT_RETRIES):
+            seq = self._seqs[i]
+            state = (self.floors[i], self.directions[i], self.doors[i], self.internal_bits[i])
+            if not seq & 1 and self._seqs[i] == seq:
+                return state
+        with self._stripes[i % STRIPES]:
+            return self.floors[i], self.directions[i], self.doors[i], self.internal_bits[i]
+
+    def _read_all(self):
+        """所有状态的一致时间点快照：(seqs, hall_seq, floors, directions, doors, internal_bits, up_bits, down_bits)"""
+        for _ in range(SNAPSHOT_RETRIES):
+            seqs, hall_seq = self._seqs[:], self.hall_seq
+            data = (self.floors[:], self.directions[:], self.doors[:], self.internal_bits[:],
+                    self.up_bits, self.down_bits)
+            if (hall_seq & 1 or self.hall_seq != hall_seq or self._seqs != seqs
+                    or len(data[0]) != len(seqs) or any(s & 1 for s in seqs)):
+                continue
+            return (seqs, hall_seq, *data)
+
+        locks = self._all_locks()
+        for lock in locks:
+            lock.acquire()
+        try:
+            return (self._seqs[:], self.hall_seq, self.floors[:], self.directions[:], self.doors[:],
+                    self.internal_bits[:], self.up_bits, self.down_bits)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    @staticmethod
+    def _car_dict(floor: int, code: int, door: int, bits: int) -> Dict:
+        return {
+            "floor": floor,
+            "direction": _DIRECTIONS[code],
+            "door_open": bool(door),
+            "internal_buttons": {f for f in range(1, bits.bit_length()) if bits >> f & 1},
+        }
+
+    @property
+    def version(self) -> int:
+        """累计的状态变化次数"""
+        return (sum(self._seqs) + self.hall_seq) // 2
+
+    def door_open(self, eid: int) -> bool:
+        return bool(self.doors[self._slot(eid)])
+
+    def elevator(self, eid: int) -> Dict:
+        """单部电梯的状态字典（一致读取）"""
+        return self._car_dict(*self._read_car(self._slot(eid)))
+
+    def changes_since(self, token: Optional[tuple]):
+        """
+        返回 (新令牌, 变化的电梯号集合, 变化的外部按钮楼层集合)；
+        token 为 None（首次读取）时两个集合都返回 None，表示需要全量刷新
+        """
+        seqs, hall_seq, *_, up_bits, down_bits = self._read_all()
+        new_token = (seqs, hall_seq, up_bits, down_bits)
+        if token is None:
+            return new_token, None, None
+        old_seqs, _, old_up, old_down = token
+        elevators = {i + 1 for i, seq in enumerate(seqs) if i >= len(old_seqs) or seq != old_seqs[i]}
+        hall = (up_bits ^ old_up) | (down_bits ^ old_down)
+        floors = {f for f in range(hall.bit_length()) if hall >> f & 1}
+        return new_token, elevators, floors
+
+    def wait_for_change(self, token: Optional[tuple], timeout: float = None) -> bool:
+        """阻塞直到状态相对 token 发生变化（或超时），返回是否发生了变化"""
+        if token is None:
+            return True
+        seqs, hall_seq = token[0], token[1]
+        with self._changed:
+            self._waiting += 1
+            try:
+                return self._changed.wait_for(lambda: self._seqs != seqs or self.hall_seq != hall_seq, timeout)
+            finally:
+                self._waiting -= 1
 
     def get_snapshot(self):
+        """所有电梯与外部按钮在同一时间点的一致快照（独立副本）"""
+        _, _, floors, directions, doors, internal_bits, up_bits, down_bits = self._read_all()
         return {
-            "elevators": self.states,
-            "external_buttons": self.external_buttons
+            "elevators": {
+                i + 1: self._car_dict(floors[i], directions[i], doors[i], internal_bits[i])
+                for i in range(len(floors))
+            },
+            "external_buttons": {
+                floor: {"UP": bool(up_bits >> floor & 1), "DOWN": bool(down_bits >> floor & 1)}
+                for floor in self.building.floors()
+            }
         }
 
-state_manager = ElevatorStateManager()
\ No newline at end of file
+state_manager = ElevatorStateManager()
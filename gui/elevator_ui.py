@@ -2,42 +2,21 @@
 import gradio as gr
 import threading
 import time
+from typing import Callable, Dict, Optional, Tuple
+from building import BuildingConfig
 from gui.elevator_state import state_manager
+from log_writer import event_log
 from request import Request, RequestType, UserIntent, Direction
 
-NUM_ELEVATORS = 5
-NUM_FLOORS = 20
+MIN_PUSH_INTERVAL = 0.1  # 两次状态推送的最小间隔（秒）
+IDLE_TIMEOUT = 5.0       # 无变化时的最长等待（秒），到时检查程序是否已停止
 
-button_refs = {
-    "external": {},  # (eid, floor, intent) -> button
-    "internal": {},  # (eid, floor) -> button
-    "sos": {},       # (eid) -> button
-    "open": {},      # (eid) -> button
-    "close": {},     # (eid) -> button
-}
-status_htmls = {}  # eid -> gr.HTML()
+# 面板命令 "动作:电梯号:楼层"，由页面脚本根据点击的单元格拼出，交给同一个回调解析
+HALL_ACTIONS = {"up": UserIntent.UP, "down": UserIntent.DOWN}
+CAR_ACTIONS = ("cabin", "sos", "open", "close")
+ARROWS = {Direction.UP: "▲", Direction.DOWN: "▼", Direction.NONE: "■"}
 
 CUSTOM_CSS = """
-button.small-btn {
-    width: 40px !important;
-    height: 40px !important;
-    font-size: 20px !important;
-    padding: 2px 4px !important;
-    margin: 2px !important;
-    min-width: 45px !important;
-    max-width: 45px !important;
-    display: inline-block !important;
-}
-.external-btn {
-    width: 40px !important;
-    height: 35px !important;
-    font-size: 15px !important;
-    padding: 0px 4px !important;
-    margin: 0px !important;
-    min-width: 40px !important;
-    max-width: 40px !important;
-    display: inline-block !important;
-}
 .stop-btn {
     font-size: 20px !important;
     width: 100px !important;
@@ -47,16 +26,143 @@ button.small-btn {
     padding: 2px 4px !important;
     margin: 4px !important;
 }
-.status-box {
-    font-size: 20px;
-    padding: 4px;
+table.panel {
+    border-collapse: collapse;
+    font-size: 13px;
+    user-select: none;
+}
+table.panel th, table.panel td {
+    border: 1px solid var(--border-color-primary);
+    min-width: 26px;
+    height: 22px;
+    padding: 0 2px;
+    text-align: center;
+}
+table.panel td {
+    cursor: pointer;
+}
+table.panel td:hover {
+    background: var(--background-fill-secondary);
+}
+table.panel td.lit {
+    background: #fbbf24;
+}
+table.panel td.car {
+    background: #3b82f6;
+    color: white;
+}
+table.panel td.car.open {
+    background: #22c55e;
+}
+table.panel tr.head th {
+    height: 36px;
+}
+.car-panels {
+    gap: 0 !important;
+    flex-wrap: nowrap !important;
+}
+.car-panels > * {
+    flex: 0 0 auto !important;
+    min-width: 0 !important;
 }
 """
 
-def create_ui(elevator_threads):
-    stop_event = threading.Event()
+# 事件委托：整个页面只有一个点击监听（捕获阶段，先于 Gradio 的 click 事件），
+# 按单元格所在的行与列解码出命令，暂存后由 click 事件的 js 取走。
+# 轿厢面板每部电梯一个单列表格（data-car 即电梯号，没有楼层标题列），外部按钮面板按列号换算电梯号
+PANEL_JS = """
+<script>
+document.addEventListener("click", (event) => {
+    const cell = event.target.closest("table.panel td");
+    if (!cell) return;
+    const row = cell.parentElement, table = row.closest("table");
+    const car = table.dataset.car;
+    const cols = Number(table.dataset.cols), index = cell.cellIndex - (car ? 0 : 1);
+    const action = row.dataset.a || table.dataset.a.split(",")[index % cols];
+    window.elevatorPanelCommand = `${action}:${car || Math.floor(index / cols) + 1}:${row.dataset.f || 0}`;
+}, true);
+</script>
+"""
+READ_COMMAND_JS = """
+() => {
+    const command = window.elevatorPanelCommand || "";
+    window.elevatorPanelCommand = "";
+    return [command];
+}
+"""
 
-    with gr.Blocks(title="电梯系统可视化", css=CUSTOM_CSS) as demo:
+def render_hall(snapshot: Dict, building: BuildingConfig) -> str:
+    """
+    外部按钮面板：每层一行，每部电梯两列（上行 / 下行）。
+    外部按钮的亮灭按楼层记录，同一层一行内的所有电梯共用，因此整行由两种单元格重复拼成
+    """
+    rows = ['<table class="panel" data-cols="2" data-a="up,down"><tr><th></th>']
+    rows.extend(f'<th colspan="2">E{eid}</th>' for eid in building.elevator_ids())
+    rows.append("</tr>")
+    buttons = snapshot["external_buttons"]
+    for floor in reversed(building.floors()):
+        up = '<td class="lit">▲</td>' if buttons[floor]["UP"] else "<td>▲</td>"
+        down = '<td class="lit">▼</td>' if buttons[floor]["DOWN"] else "<td>▼</td>"
+        rows.append(f'<tr data-f="{floor}"><th>{floor}F</th>{(up + down) * building.num_elevators}</tr>')
+    rows.append("</table>")
+    return "".join(rows)
+
+def render_car_labels(building: BuildingConfig) -> str:
+    """轿厢面板左侧的行标题（报警 / 开门 / 关门 + 各楼层），与各电梯的列逐行对齐，不随状态变化"""
+    rows = ['<table class="panel"><tr class="head"><th></th></tr>',
+            "<tr><th>报警</th></tr><tr><th>开门</th></tr><tr><th>关门</th></tr>"]
+    rows.extend(f"<tr><th>{floor}F</th></tr>" for floor in reversed(building.floors()))
+    rows.append("</table>")
+    return "".join(rows)
+
+def render_car(eid: int, car: Dict, building: BuildingConfig) -> str:
+    """
+    轿厢面板中 eid 号电梯的一列：前三行为报警 / 开门 / 关门，其下每层一行。
+    电梯所在的单元格显示运行方向（开门时变色），已按下的内部按钮高亮；点击某层的单元格即按下该电梯内的楼层按钮。
+    每部电梯单独一个组件，状态推送时只重绘发生变化的电梯
+    """
+    rows = [f'<table class="panel" data-car="{eid}" data-cols="1" data-a="cabin">',
+            f'<tr class="head"><th>E{eid}<br>{car["floor"]}F</th></tr>',
+            '<tr data-a="sos"><td>🔴</td></tr><tr data-a="open"><td>开</td></tr><tr data-a="close"><td>关</td></tr>']
+    for floor in reversed(building.floors()):
+        if car["floor"] == floor:
+            door = " open" if car["door_open"] else ""
+            cell = f'<td class="car{door}">{ARROWS[car["direction"]]}</td>'
+        elif floor in car["internal_buttons"]:
+            cell = '<td class="lit"></td>'
+        else:
+            cell = "<td></td>"
+        rows.append(f'<tr data-f="{floor}">{cell}</tr>')
+    rows.append("</table>")
+    return "".join(rows)
+
+def parse_command(command: str, building: BuildingConfig) -> Optional[Tuple[str, int, int]]:
+    """解析面板命令 "动作:电梯号:楼层"，格式不对或越界时返回 None（命令来自浏览器，不可信）"""
+    try:
+        action, eid, floor = command.split(":")
+        eid, floor = int(eid), int(floor)
+    except ValueError:
+        return None
+    if not 1 <= eid <= building.num_elevators:
+        return None
+    if action in HALL_ACTIONS or action == "cabin":
+        if not 1 <= floor <= building.num_floors:
+            return None
+    elif action not in CAR_ACTIONS:
+        return None
+    return action, eid, floor
+
+def create_ui(elevator_threads, building: BuildingConfig, stop_event: threading.Event = None,
+              on_request: Callable[[Request], None] = None):
+    """
+    stop_event: 点击停止按钮时被 set，由调用方负责关闭界面与电梯运行时。
+    on_request: 可选回调，每提交一个请求前调用一次（如 Metrics.record_request）。
+    外部按钮渲染为一个 HTML 表格，每部电梯的轿厢按钮各渲染为一个单列表格，所有按钮共用一个回调，
+    组件数与事件数不随电梯数 × 楼层数增长
+    """
+    stop_event = stop_event or threading.Event()
+
+    with gr.Blocks(title="电梯系统可视化", css=CUSTOM_CSS, head=PANEL_JS) as demo:
         gr.Markdown("# 🛗 多电梯调度系统")
 
         # 停止按钮
@@ -65,157 +171,84 @@ def create_ui(elevator_threads):
 
             def stop_program():
                 stop_event.set()
-                with open("elevator_log.txt", "a", encoding="utf-8") as f:
-                    f.write("🚨 用户终止了程序运行。\n")
+                event_log.write("🚨 用户终止了程序运行。")
                 for elevator in elevator_threads:
-                    elevator.stop()
-                import os
-                os._exit(0)
+                    elevator.stop(release=False)
 
             stop_button.click(stop_program, None)
 
+        snapshot = state_manager.get_snapshot()
         with gr.Row():
             # 外部请求按钮
             with gr.Column(scale=1):
                 gr.Markdown("## 电梯间")
-                
-                for floor in reversed(range(1, NUM_FLOORS + 1)):
-                    gr.Markdown(f"### 🏢 {floor} F")
-
-                    # 上行按钮行
-                    with gr.Row():
-                        for eid in range(1, NUM_ELEVATORS + 1):
-                            label = f"E{eid}🔼"
-                            btn = gr.Button(label, elem_classes=f"external-btn elevator-{eid}")
-                            button_refs["external"][(eid, floor, UserIntent.UP)] = btn
-
-                            def make_func(e=eid, f=floor, i=UserIntent.UP):
-                                def _submit():
-                                    req = Request(floor=f, request_type=RequestType.EXTERNAL, user_intent=i)
-                                    state_manager.set_external_button(f, i, True)
-                                    elevator_threads[e - 1].add_request(req)
-                                    with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-                                        logf.write(f"[外部请求] {f} 楼用户上行，呼叫电梯 {e} \n")
-                                return _submit
-
-                            btn.click(make_func(), None)
-
-                    # 下行按钮行
-                    with gr.Row():
-                        for eid in range(1, NUM_ELEVATORS + 1):
-                            label = f"E{eid}🔽"
-                            btn = gr.Button(label, elem_classes=f"external-btn elevator-{eid}")
-                            button_refs["external"][(eid, floor, UserIntent.DOWN)] = btn
-
-                            def make_func(e=eid, f=floor, i=UserIntent.DOWN):
-                                def _submit():
-                                    req = Request(floor=f, request_type=RequestType.EXTERNAL, user_intent=i)
-                                    state_manager.set_external_button(f, i, True)
-                                    elevator_threads[e - 1].add_request(req)
-                                    with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-                                        logf.write(f"[外部请求] {f} 楼用户下行，呼叫电梯 {e} \n")
-                                return _submit
-
-                            btn.click(make_func(), None)
-
-
-            # 内部按钮 + 状态栏
-            with gr.Column(scale=4):
-                for eid in range(1, NUM_ELEVATORS + 1):
-                    with gr.Group():
-                        gr.Markdown(f"## 🚪 电梯 {eid}")
-
-                        with gr.Row():
-                            status_htmls[eid] = gr.HTML(value="状态更新中...", elem_classes="status-box")
-                            snapshot = state_manager.get_snapshot()
-
-                            sos_event = threading.Event()
-                            sos_btn = gr.Button("🔴 报警", elem_classes="stop-btn")
-                            button_refs["sos"][eid] = sos_btn
-
-                            def make_sos_func(e=eid):
-                                sos_event.set()
-                                def _stop(e=e):                                    
-                                    with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-                                        logf.write(f"[内部请求] 电梯 {e} 内用户报警\n")
-                                    elevator_threads[e-1].sos()
-                                    #print(f"电梯 {e} 报警")
-                                return _stop
-                            sos_btn.click(make_sos_func(), None)
-
-                            open_event = threading.Event()
-                            open_btn = gr.Button("开", elem_classes="small-btn")
-                            button_refs["open"][eid] = open_btn
-
-                            def make_open_func(e=eid):
-                                open_event.set()
-                                def _open(e=e):
-                                    if not snapshot["elevators"][eid]["door_open"]:
-                                        with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-                                            logf.write(f"[内部请求] 电梯 {e} 开门\n")
-                                        elevator_threads[e-1].open_door()
-                                    else:
-                                        with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-                                            logf.write(f"[内部请求] 电梯 {e} 开门\n[拦截回应] 电梯 {e} 已开门\n")
-                                return _open
-                            open_btn.click(make_open_func(), None)
-
-                            close_event = threading.Event()
-                            close_btn = gr.Button("关", elem_classes="small-btn")
-                            button_refs["close"][eid] = close_btn
-
-                            def make_close_func(e=eid):
-                                close_event.set()
-                                def _close(e=e):
-                                    if snapshot["elevators"][eid]["door_open"]:
-                                        with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-                                            logf.write(f"[内部请求] 电梯 {e} 关门\n")
-                                        elevator_threads[e-1].close_door()
-                                    else:
-                                        with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-                                            logf.write(f"[内部请求] 电梯 {e} 关门\n[拦截回应] 电梯 {e} 已关门\n")
-                                return _close
-                            close_btn.click(make_close_func(), None)
-
-                        for row in range(2):
-                            with gr.Row():
-                                for col in range(10):
-                                    floor_num = row * 10 + col + 1
-                                    btn = gr.Button(str(floor_num), elem_classes="small-btn")
-                                    button_refs["internal"][(eid, floor_num)] = btn
-
-                                    def make_internal_func(e=eid, f=floor_num):
-                                        def _submit(e=e, f=f):
-                                            req = Request(floor=f, request_type=RequestType.INTERNAL)
-                                            state_manager.set_internal_button(e, f, True)
-                                            elevator_threads[e - 1].add_request(req)
-                                            with open("elevator_log.txt", "a", encoding="utf-8") as logf:
-                                                logf.write(f"[内部请求] 电梯 {e} 内部请求前往 {f} 楼\n")
-                                        return _submit
-
-                                    btn.click(make_internal_func(), None)
-
-        # 新建一个状态组件用于定时刷新
-        dummy_state = gr.State(value=0)  # 触发器，无实际用途
-
-        def update_status(dummy_input):  # dummy_input 是 dummy_state 的值
-            snapshot = state_manager.get_snapshot()
-
-            for eid in range(1, NUM_ELEVATORS + 1):
-                state = snapshot["elevators"][eid]
-                floor = state["floor"]
-                dir_str = state["direction"].name
-                door = "开" if state["door_open"] else "关"
-
-                try:
-                    status_htmls[eid]=f"<div>楼层：<b>{floor}</b> ｜ 方向：<b>{dir_str}</b> ｜ 门：<b>{door}</b></div>"
-                except Exception as e:
-                    print(f"Error updating button状态: {e}")
-
-            return (dummy_input + 1,*[status_htmls[eid] for eid in range(1, NUM_ELEVATORS + 1)])  # 返回值作为 dummy_state 的新值，形成循环
-
-        outputs = [dummy_state] + [status_htmls[eid] for eid in range(1, NUM_ELEVATORS + 1)]
-        timer = gr.Timer(value=0.5, active=True, render=True)
-        timer.tick(update_status, inputs=dummy_state, outputs=outputs)
-
-    return demo
\ No newline at end of file
+                hall_panel = gr.HTML(render_hall(snapshot, building), padding=False)
+
+            # 内部按钮 + 状态
+            with gr.Column(scale=2):
+                gr.Markdown("## 🚪 轿厢")
+                with gr.Row(elem_classes="car-panels"):
+                    gr.HTML(render_car_labels(building), padding=False)
+                    car_panels = [gr.HTML(render_car(eid, snapshot["elevators"][eid], building), padding=False)
+                                  for eid in building.elevator_ids()]
+
+        command = gr.Textbox(visible=False)
+
+        def handle_command(command: str):
+            parsed = parse_command(command, building)
+            if parsed is None:
+                return
+            action, e, f = parsed
+            elevator = elevator_threads[e - 1]
+            if action in HALL_ACTIONS:
+                intent = HALL_ACTIONS[action]
+                req = Request(floor=f, request_type=RequestType.EXTERNAL, user_intent=intent)
+                state_manager.set_external_button(f, intent, True)
+                if on_request is not None:
+                    on_request(req)
+                elevator.add_request(req)
+                event_log.write(f"[外部请求] {f} 楼用户{'上行' if intent == UserIntent.UP else '下行'}，呼叫电梯 {e}")
+            elif action == "cabin":
+                req = Request(floor=f, request_type=RequestType.INTERNAL)
+                if on_request is not None:
+                    on_request(req)
+                elevator.add_request(req)
+                event_log.write(f"[内部请求] 电梯 {e} 内部请求前往 {f} 楼")
+            elif action == "sos":
+                event_log.write(f"[内部请求] 电梯 {e} 内用户报警")
+                elevator.sos()
+            elif action == "open":
+                event_log.write(f"[内部请求] 电梯 {e} 开门")
+                if not state_manager.door_open(e):
+                    elevator.open_door()
+                else:
+                    event_log.write(f"[拦截回应] 电梯 {e} 已开门")
+            else:
+                event_log.write(f"[内部请求] 电梯 {e} 关门")
+                if state_manager.door_open(e):
+                    elevator.close_door()
+                else:
+                    event_log.write(f"[拦截回应] 电梯 {e} 已关门")
+
+        # 所有面板的点击共用一个回调；按钮操作很快，不限并发，多个会话的点击互不排队
+        gr.on([hall_panel.click, *(panel.click for panel in car_panels)], handle_command, command, None, js=READ_COMMAND_JS,
+              show_progress="hidden", concurrency_limit=None)
+
+        # 状态推送：每个浏览器会话一个生成器，状态变化时才推送；
+        # 外部按钮有变化时重绘外部按钮面板，轿厢面板只重绘状态发生变化的电梯那一列
+        def stream_status():
+            token = None  # 首次全量推送
+            while not stop_event.is_set():
+                token, changed, floors = state_manager.changes_since(token)
+                if changed is None or changed or floors:
+                    hall = render_hall(state_manager.get_snapshot(), building) if changed is None or floors else gr.skip()
+                    yield [hall, *(render_car(eid, state_manager.elevator(eid), building)
+                                   if changed is None or eid in changed else gr.skip()
+                                   for eid in building.elevator_ids())]
+                    time.sleep(MIN_PUSH_INTERVAL)  # 合并短时间内的连续变化
+                state_manager.wait_for_change(token, timeout=IDLE_TIMEOUT)
+
+        # 长连接不应占用默认的单并发名额，否则第二个浏览器会话会排队
+        demo.load(stream_status, None, [hall_panel, *car_panels], concurrency_limit=None)
+
+    return demo
@@ -0,0 +1,195 @@
+# instrumentation.py
+import json
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, TextIO
+
+from metrics import Histogram
+
+TIMER_RESOLUTION = 1e-7  # 计时器的零桶上限（秒），低于 0.1 微秒的耗时不区分
+
+class Probe:
+    """
+    一个作用域（某部电梯、调度器或日志写线程）的计数器与计时器。
+    热路径上只在挂了探针时才取时间戳：对象的 probe 属性为 None 即关闭，开销只有一次属性判断。
+    参数说明：
+    - scope: 作用域名称，如 "dispatcher"、"elevator-3"
+    - counters: 名称 -> 次数
+    - timers: 名称 -> 耗时分布（秒，对数分桶，可取 p50/p95/p99）
+    """
+    __slots__ = ("scope", "counters", "timers", "_lock")
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        self.counters: Dict[str, int] = {}
+        self.timers: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()  # 调度器的探针会被多部电梯的线程同时记录
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Histogram(min_value=TIMER_RESOLUTION)
+            timer.add(seconds)
+
+    def timed_lock(self, lock, name: str = "lock") -> "_TimedLock":
+        """包装一次加锁：记录等待时间（<name>_wait）与持有时间（<name>_hold）"""
+        return _TimedLock(self, lock, name)
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.timers = {}
+
+    def summary(self) -> Dict:
+        """计数与各计时器的次数、总耗时、均值、最大值和分位数（秒）"""
+        with self._lock:
+            timers = {}
+            for name, timer in sorted(self.timers.items()):
+                timers[name] = {"total": timer.total, **timer.summary()}
+            return {"counters": dict(sorted(self.counters.items())), "timers": timers}
+
+
+class _TimedLock:
+    """Probe.timed_lock 返回的上下文管理器，用法与 with lock: 相同"""
+    __slots__ = ("probe", "lock", "name", "_acquired")
+
+    def __init__(self, probe: Probe, lock, name: str):
+        self.probe = probe
+        self.lock = lock
+        self.name = name
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self.lock.acquire()
+        self._acquired = time.perf_counter()
+        self.probe.record(f"{self.name}_wait", self._acquired - start)
+        return self
+
+    def __exit__(self, *exc):
+        self.lock.release()
+        self.probe.record(f"{self.name}_hold", time.perf_counter() - self._acquired)
+        return False
+
+
+# ========== 输出端（sink）：接收 Instrumentation.report() 的结果 ==========
+Sink = Callable[[Dict], None]
+
+class JsonLinesSink:
+    """每次报告追加为 JSON Lines 文件中的一行"""
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, report: Dict):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False))
+            f.write("\n")
+
+
+class ConsoleSink:
+    """把每个计时器打印成一行：作用域、名称、次数、总耗时和均值 / p99（微秒）"""
+    def __init__(self, stream: TextIO = None):
+        self.stream = stream
+
+    def __call__(self, report: Dict):
+        stream = self.stream or sys.stdout
+        print(f"—— 性能剖析（{report['elapsed']:.1f} 秒）——", file=stream)
+        for scope, summary in report["scopes"].items():
+            for name, timer in summary["timers"].items():
+                print(f"{scope:<14} {name:<16} n={timer['count']:<9} total={timer['total']:.3f}s "
+                      f"mean={timer['mean'] * 1e6:.1f}µs p99={timer['p99'] * 1e6:.1f}µs max={timer['max'] * 1e6:.1f}µs",
+                      file=stream)
+            for name, value in summary["counters"].items():
+                print(f"{scope:<14} {name:<16} {value}", file=stream)
+
+
+class Instrumentation:
+    """
+    热路径剖析：调度器的锁等待 / 持有时间与改派耗时，每部电梯的 next_stop 决策耗时、
+    调度步计算时间与休眠时间、日志入队耗时，以及日志写线程的文件写入耗时。
+    attach() 把探针挂到各对象的 probe 属性上即开启，detach() 摘下即关闭，可在运行中随时切换；
+    未挂探针时热路径只多一次 "probe is None" 判断
+    """
+    def __init__(self, sinks: Iterable[Sink] = ()):
+        """
+        参数说明：
+        - sinks: 输出端列表，每个都是接收报告字典的可调用对象（如 JsonLinesSink、ConsoleSink）
+        """
+        self.sinks: List[Sink] = list(sinks)
+        self.probes: Dict[str, Probe] = {}
+        self._targets = []
+        self.started_at = time.perf_counter()
+        self._report_stop = None
+        self._report_thread = None
+
+    def probe(self, scope: str) -> Probe:
+        probe = self.probes.get(scope)
+        if probe is None:
+            probe = self.probes[scope] = Probe(scope)
+        return probe
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._targets)
+
+    def attach(self, dispatcher=None, elevators: Iterable = (), logger=None):
+        """开启剖析：给调度器、各电梯和日志写入器挂上探针（可多次调用追加对象）"""
+        if dispatcher is not None:
+            self._hook(dispatcher, self.probe("dispatcher"))
+        for elevator in elevators:
+            self._hook(elevator, self.probe(f"elevator-{elevator.elevator_id}"))
+        if logger is not None:
+            self._hook(logger, self.probe("log-writer"))
+
+    def _hook(self, target, probe: Probe):
+        target.probe = probe
+        self._targets.append(target)
+
+    def detach(self):
+        """关闭剖析：摘下所有探针，已记录的数据保留"""
+        for target in self._targets:
+            target.probe = None
+        self._targets = []
+
+    def reset(self):
+        """清空已记录的数据，重新开始计时"""
+        for probe in self.probes.values():
+            probe.reset()
+        self.started_at = time.perf_counter()
+
+    def report(self) -> Dict:
+        return {
+            "time": time.time(),
+            "elapsed": time.perf_counter() - self.started_at,
+            "scopes": {scope: probe.summary() for scope, probe in sorted(self.probes.items())},
+        }
+
+    def emit(self):
+        """把当前报告交给所有输出端"""
+        report = self.report()
+        for sink in self.sinks:
+            sink(report)
+
+    def start_reporting(self, interval: float = 60.0):
+        """后台线程每隔 interval 秒输出一次报告，stop_reporting() 时再输出最后一次"""
+        self.stop_reporting()
+        self._report_stop = stop = threading.Event()
+
+        def _run():
+            while not stop.wait(interval):
+                self.emit()
+            self.emit()
+
+        self._report_thread = threading.Thread(target=_run, name="instrumentation-report", daemon=True)
+        self._report_thread.start()
+
+    def stop_reporting(self):
+        if self._report_stop is not None:
+            self._report_stop.set()
+            self._report_thread.join()
+            self._report_stop = self._report_thread = None
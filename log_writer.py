@@ -0,0 +1,180 @@
+# log_writer.py
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+LOG_FILE = "elevator_log.txt"
+FILE_BUFFER = 1 << 16  # 文件缓冲区（字节），两次 flush 之间的日志留在缓冲区中
+
+_STOP = object()  # 关闭哨兵
+
+class LogWriter:
+    """
+    异步批量日志：各线程只把日志条目放入队列（不做文件 IO），
+    由唯一的后台线程批量写入文件缓冲区，累计 batch_size 条或距上次 flush 超过 flush_interval 时才 flush，
+    同时负责按大小 / 时间轮转日志文件。
+    - fmt="text": 每行一条原始日志文本（与原 elevator_log.txt 格式一致）
+    - fmt="jsonl": 每行一个 JSON 对象，包含时间戳、日志文本和结构化字段
+    """
+    def __init__(self, path: str = LOG_FILE, fmt: str = "text", batch_size: int = 256,
+                 flush_interval: float = 0.5, max_bytes: int = 10 * 1024 * 1024,
+                 rotate_interval: Optional[float] = None, backup_count: int = 5):
+        """
+        参数说明：
+        - path: 日志文件路径
+        - fmt: 日志格式，"text" 或 "jsonl"
+        - batch_size: 单次批量写入的最大条目数；未 flush 的条目累计到这么多时立即 flush
+        - flush_interval: 两次 flush 的最长间隔（秒），即日志落盘的最大延迟
+        - max_bytes: 单个日志文件的大小上限，超过后轮转；0 表示不按大小轮转
+        - rotate_interval: 按时间轮转的周期（秒），None 表示不按时间轮转
+        - backup_count: 保留的历史日志文件数（path.1 ... path.N）
+        """
+        if fmt not in ("text", "jsonl"):
+            raise ValueError(f"未知的日志格式: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._size = 0        # 当前日志文件的字节数（含尚未 flush 的部分）
+        self._opened_at = 0.0
+        self.probe = None  # 可选的剖析探针（instrumentation.Probe），记录批量写文件的耗时
+
+    # ========== 生产者：任意线程调用 ==========
+    def write(self, message: str, **fields):
+        """提交一条日志，只入队不阻塞；fields 为结构化字段（仅 jsonl 格式输出）"""
+        if self._thread is None:
+            self._start()
+        self._queue.put((time.time(), message, fields))
+
+    def flush(self, timeout: float = None):
+        """阻塞直到此前提交的日志全部写入文件"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """写完剩余日志并停止后台线程"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    # ========== 消费者：后台写线程 ==========
+    def _run(self):
+        pending = 0                    # 已写入文件缓冲区、尚未 flush 的条目数
+        last_flush = time.monotonic()
+        while True:
+            if pending:
+                # 有未 flush 的日志：最多等到距上次 flush 满 flush_interval
+                try:
+                    item = self._queue.get(timeout=max(0.0, last_flush + self.flush_interval - time.monotonic()))
+                except queue.Empty:
+                    item = None
+            else:
+                item = self._queue.get()  # 没有待 flush 的日志时一直阻塞，空闲的写线程不会被唤醒
+
+            batch, waiters, stop = [], [], False
+            while item is not None:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(batch)
+                pending += len(batch)
+            if pending and (waiters or stop or pending >= self.batch_size
+                            or time.monotonic() - last_flush >= self.flush_interval):
+                self._file.flush()
+                pending = 0
+                last_flush = time.monotonic()
+            for done in waiters:
+                done.set()
+            if stop:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write_batch(self, batch):
+        probe = self.probe
+        start = time.perf_counter()
+        self._write_lines(batch)
+        if probe is not None:
+            probe.record("write", time.perf_counter() - start)
+            probe.count("entries", len(batch))
+
+    def _write_lines(self, batch):
+        if self._file is None:
+            self._open()
+        elif self._should_rotate():
+            self._rotate()
+
+        if self.fmt == "jsonl":
+            lines = [json.dumps({"t": round(t, 3), "msg": message, **fields}, ensure_ascii=False)
+                     for t, message, fields in batch]
+        else:
+            lines = [message for _, message, _ in batch]
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        self._file.write(data)
+        self._size += len(data)
+
+    def _open(self):
+        # 二进制追加写：自行累计文件大小，不用文本文件的 tell()（它会先 flush 缓冲区）
+        self._file = open(self.path, "ab", buffering=FILE_BUFFER)
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+
+    def _should_rotate(self) -> bool:
+        if self.max_bytes and self._size >= self.max_bytes:
+            return True
+        if self.rotate_interval is not None and time.time() - self._opened_at >= self.rotate_interval:
+            return True
+        return False
+
+    def _rotate(self):
+        """path -> path.1 -> path.2 ...，超出 backup_count 的最旧文件被丢弃"""
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+
+# 全局默认日志（写入 elevator_log.txt），进程退出时自动写完剩余日志
+event_log = LogWriter(LOG_FILE)
+atexit.register(event_log.close)
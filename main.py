@@ -1,34 +1,133 @@
 # main.py
+import argparse
+import json
+import os
 import threading
 import time
-from dispatcher import Dispatcher
+from building import BuildingConfig
+from checkpoint import Checkpoint, load, save
+from dispatcher import Dispatcher, DispatchPolicy
 from elevator import Elevator
-from gui.elevator_state import state_manager
-from gui.elevator_ui import create_ui  # UI 构建函数
+from instrumentation import Instrumentation, JsonLinesSink
+from log_writer import event_log
+from metrics import Metrics
+from parking import DemandParking
+from traffic import PATTERNS, TraceFile, poisson_traffic, replay_live
 
-NUM_ELEVATORS = 5
-NUM_FLOORS = 20
+DRAIN_POLL_INTERVAL = 0.5  # 无界面模式下交通流结束后，检查请求是否全部响应的间隔（秒）
 
-def main():
-    # 初始化 Dispatcher 和 Elevator
-    dispatcher = Dispatcher()
-    elevators = [Elevator(i + 1, dispatcher) for i in range(NUM_ELEVATORS)]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="电梯调度系统（默认 Gradio 界面，--headless 为无界面命令行模式）")
+    parser.add_argument("--elevators", type=int, default=5, help="电梯数")
+    parser.add_argument("--floors", type=int, default=20, help="楼层数")
+    parser.add_argument("--runtime", default="thread", choices=["thread", "asyncio"],
+                        help="电梯运行时：每部电梯一个线程，或所有电梯共用一个 asyncio 事件循环")
+    parser.add_argument("--metrics", default=None, help="性能指标文件（JSON Lines），每分钟追加一次汇总")
+    parser.add_argument("--profile", default=None,
+                        help="性能剖析文件（JSON Lines）：每分钟追加一次锁等待、next_stop、休眠 / 计算、日志写入的耗时统计")
+    parser.add_argument("--parking", action="store_true", help="按需求预测把空闲电梯调度到热点楼层等候")
+    parser.add_argument("--checkpoint", default=None,
+                        help="检查点文件：启动时若存在则从中恢复电梯状态与未响应的请求，退出时写回")
 
-    # 启动电梯线程
-    for e in elevators:
-        e.start()
+    headless = parser.add_argument_group("无界面模式（不导入 Gradio）")
+    headless.add_argument("--headless", action="store_true", help="不启动界面，按交通流实时驱动电梯，结束后输出指标")
+    headless.add_argument("--trace", default=None, help="实时回放的轨迹文件（.jsonl / .jsonl.gz）；加速回放请用 python traffic.py replay --speed")
+    headless.add_argument("--pattern", default="interfloor", choices=sorted(PATTERNS), help="未指定 --trace 时生成的交通模式")
+    headless.add_argument("--duration", type=float, default=60.0, help="生成交通流的时长（秒）")
+    headless.add_argument("--mean-interval", type=float, default=5.0, help="生成交通流的平均到达间隔（秒）")
+    headless.add_argument("--seed", type=int, default=None, help="随机种子")
+    headless.add_argument("--policy", default="ETA", choices=[p.name for p in DispatchPolicy], help="调度策略")
+    args = parser.parse_args(argv)
+    building = BuildingConfig(num_elevators=args.elevators, num_floors=args.floors)
 
-    # 创建并启动 Gradio UI，把 elevators 传入 UI
-    ui = create_ui(elevators)
+    # 界面模式才导入 gui 包（Gradio 与状态管理），状态管理作为观察者挂到每部电梯上
+    observer = None
+    if not args.headless:
+        from gui.elevator_state import state_manager
+        state_manager.configure(building)
+        observer = state_manager
 
+    # 初始化 Dispatcher 和 Elevator；界面模式下外部请求交给界面上呼叫的那部电梯
+    policy = DispatchPolicy[args.policy] if args.headless else DispatchPolicy.MANUAL
+    dispatcher = Dispatcher(verbose=not args.headless, policy=policy, building=building)
+    elevators = [Elevator(eid, dispatcher, observer=observer) for eid in building.elevator_ids()]
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        checkpoint = load(args.checkpoint)
+        checkpoint.apply(dispatcher, elevators)
+        if observer is not None:
+            for floor, intent, _, _ in checkpoint.calls:
+                observer.set_external_button(floor, intent, True)  # 恢复的外部请求在界面上亮起
+        print(f"已从检查点恢复: {checkpoint}")
+    if args.parking:
+        DemandParking(building).attach(dispatcher, elevators)
+    metrics = Metrics()
+    metrics.attach(dispatcher, elevators)
+    if args.metrics:
+        metrics.start_dump(args.metrics)
+    profiler = Instrumentation([JsonLinesSink(args.profile)] if args.profile else [])
+    if args.profile:
+        profiler.attach(dispatcher, elevators, event_log)
+        profiler.start_reporting()
+
+    # 启动电梯：每部电梯一个线程，或所有电梯作为协程共用一个事件循环线程
+    runtime = None
+    if args.runtime == "asyncio":
+        from async_runtime import AsyncRuntime  # asyncio 的导入开销只在选用该运行时时支付
+        runtime = AsyncRuntime(elevators)
+        runtime.start()
+    else:
+        for e in elevators:
+            e.start()
+
+    stop_event = threading.Event()
+    ui = None
     try:
-        ui.launch()
+        if args.headless:
+            run_headless(args, building, dispatcher, elevators, metrics, stop_event)
+        else:
+            # 创建并启动 Gradio UI，把 elevators 传入 UI；点击停止按钮后 stop_event 被 set
+            from gui.elevator_ui import create_ui
+            ui = create_ui(elevators, building, stop_event, on_request=metrics.record_request)
+            ui.launch(prevent_thread_lock=True)
+            stop_event.wait()
+    except KeyboardInterrupt:
+        pass
     finally:
-        # UI 关闭后安全关闭 Elevator 线程
+        # 依次关闭界面、电梯和指标输出，保存检查点，剩余日志由 atexit 写完
+        stop_event.set()
+        if ui is not None:
+            ui.close()
         for e in elevators:
-            e.stop()  # 请确保 Elevator 类有 stop() 方法设置退出标志位
-        for e in elevators:
-            e.join()  # 等待所有线程结束
+            e.stop(release=False)  # 整体退出，不改派（否则最后一部电梯停下后所有请求都变成未分配）
+        if runtime is not None:
+            runtime.join()
+        else:
+            for e in elevators:
+                e.join()  # 等待所有线程结束
+        metrics.stop_dump()
+        profiler.stop_reporting()
+        if args.checkpoint:
+            # 所有电梯停稳后保存，下次启动时未响应的请求不会丢失
+            save(Checkpoint.capture(dispatcher, elevators), args.checkpoint)
+    if args.headless:
+        print(json.dumps(metrics.summary(), ensure_ascii=False))
+
+def run_headless(args, building: BuildingConfig, dispatcher: Dispatcher, elevators, metrics: Metrics,
+                 stop_event: threading.Event):
+    """无界面模式：按真实时间把交通流交给运行中的电梯，交通流结束且请求全部响应后返回"""
+    if args.trace:
+        entries = TraceFile(args.trace)
+    else:
+        entries = poisson_traffic(args.pattern, building, args.duration, args.mean_interval, args.seed)
+    count = replay_live(entries, elevators, dispatcher, stop_event=stop_event,
+                        on_request=metrics.record_request)
+    print(f"已提交 {count} 个请求，等待电梯响应完毕 ...")
+    while not stop_event.is_set():
+        if not dispatcher.get_requests() and not any(e.internal_requests for e in elevators):
+            break
+        if not any(e.running for e in elevators):
+            break  # 电梯全部报警停运，剩余请求无法响应
+        stop_event.wait(DRAIN_POLL_INTERVAL)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
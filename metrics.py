@@ -0,0 +1,158 @@
+# metrics.py
+import json
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List
+from request import Request, RequestType
+
+RELATIVE_ERROR = 0.01  # 分位数的相对误差上限
+MIN_VALUE = 1e-3       # 小于该值（秒）的样本计入零桶
+QUANTILES = (0.5, 0.95, 0.99)
+
+class Histogram:
+    """
+    流式分位数统计（对数分桶）：样本 x 落入第 ceil(log_gamma(x)) 个桶，
+    gamma = (1 + e) / (1 - e)，分位数的相对误差不超过 e。
+    桶数只与数值范围有关（1 毫秒到 1 天约 1100 个桶），与样本数无关，内存有界
+    """
+    __slots__ = ("count", "total", "min", "max", "zeros", "buckets", "_log_gamma", "_gamma", "_min_value")
+
+    def __init__(self, relative_error: float = RELATIVE_ERROR, min_value: float = MIN_VALUE):
+        """min_value: 小于该值的样本计入零桶（计时微秒级操作时应相应调小）"""
+        self._min_value = min_value
+        self._gamma = (1 + relative_error) / (1 - relative_error)
+        self._log_gamma = math.log(self._gamma)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.zeros = 0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value < self._min_value:
+            self.zeros += 1
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def quantile(self, q: float) -> float:
+        """
+        第 q 分位数（0 <= q <= 1），没有样本时返回 nan。
+        按最近秩定义取第 ceil(q * count) 小的样本（至少第 1 个），样本少时高分位数不会低于实际值：
+        落在最大秩上时直接返回实际最大值，其余返回所在桶的代表值（相对误差不超过 e）
+        """
+        if not self.count:
+            return math.nan
+        rank = max(1, math.ceil(q * self.count))
+        if rank >= self.count:
+            return self.max
+        seen = self.zeros
+        if rank <= seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank <= seen:
+                # 取桶的代表值，并夹在实际最小、最大值之间
+                value = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        result = {"count": self.count, "mean": self.mean(), "max": self.max if self.count else math.nan}
+        for q in QUANTILES:
+            result[f"p{round(q * 100)}"] = self.quantile(q)
+        return result
+
+
+class Metrics:
+    """
+    乘客级性能指标：
+    - wait: 外部请求从按下按钮（Request.timestamp）到被电梯响应的候梯时间
+    - ride: 内部请求从按下楼层按钮到电梯到达该层的乘梯时间
+    - 每部电梯响应的外部 / 内部请求数
+    通过 attach() 挂到 Dispatcher.on_remove 与 Elevator.on_remove 上；
+    clock 为当前时刻的来源（线程模式为 time.time，离散事件仿真为虚拟时钟）
+    """
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.lock = threading.Lock()  # 多个电梯线程会同时回调
+        self.started_at = clock()
+        self.requests = 0
+        self.wait = Histogram()
+        self.ride = Histogram()
+        self.served_by: Dict[int, List[int]] = {}  # elevator_id -> [外部请求数, 内部请求数]
+        self._dump_stop = None
+        self._dump_thread = None
+
+    def attach(self, dispatcher, elevators: Iterable):
+        """订阅调度器与各电梯的请求响应回调"""
+        dispatcher.on_remove = self.record_served
+        for elevator in elevators:
+            elevator.on_remove = self.record_served
+
+    def record_request(self, request: Request):
+        """记录新发出的请求"""
+        with self.lock:
+            self.requests += 1
+
+    def record_served(self, requests: Iterable[Request], elevator_id: int):
+        """on_remove 回调：请求被 elevator_id 号电梯响应"""
+        now = self.clock()
+        with self.lock:
+            counts = self.served_by.setdefault(elevator_id, [0, 0])
+            for request in requests:
+                if request.request_type == RequestType.EXTERNAL:
+                    self.wait.add(now - request.timestamp)
+                    counts[0] += 1
+                else:
+                    self.ride.add(now - request.timestamp)
+                    counts[1] += 1
+
+    def summary(self) -> Dict:
+        """当前指标的汇总（可直接序列化为 JSON）"""
+        with self.lock:
+            elapsed = self.clock() - self.started_at
+            served = self.wait.count + self.ride.count
+            return {
+                "time": self.clock(),
+                "requests": self.requests,
+                "served": served,
+                "throughput_per_hour": served * 3600 / elapsed if elapsed > 0 else math.nan,
+                "wait": self.wait.summary(),
+                "ride": self.ride.summary(),
+                "served_by": {eid: {"hall": c[0], "cabin": c[1]} for eid, c in sorted(self.served_by.items())},
+            }
+
+    def dump(self, path: str):
+        """把当前汇总追加为 JSON Lines 文件中的一行"""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.summary(), ensure_ascii=False))
+            f.write("\n")
+
+    def start_dump(self, path: str, interval: float = 60.0):
+        """线程模式：后台线程每隔 interval 秒（真实时间）dump 一次，stop_dump() 时再写最后一次"""
+        self.stop_dump()
+        self._dump_stop = stop = threading.Event()
+
+        def _run():
+            while not stop.wait(interval):
+                self.dump(path)
+            self.dump(path)
+
+        self._dump_thread = threading.Thread(target=_run, name="metrics-dump", daemon=True)
+        self._dump_thread.start()
+
+    def stop_dump(self):
+        if self._dump_stop is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_stop = self._dump_thread = None
@@ -0,0 +1,180 @@
+# parking.py
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from building import BuildingConfig
+from request import Request
+
+DAY = 24 * 3600          # 需求模型的周期（一天）
+SLOT = 900.0             # 时段长度（秒），一天 96 个时段
+HALF_LIFE = 7 * DAY      # 历史需求的半衰期：一周前的呼叫权重减半
+REFRESH_EVERY = 16       # 同一时段内每新增这么多次观测才重新计算一次停靠楼层
+
+def local_clock() -> float:
+    """线程模式的时钟：按本地时区平移后的 Unix 时间，使"一天中的时段"与墙上时间一致"""
+    now = time.time()
+    return now + time.localtime(now).tm_gmtoff
+
+
+class DemandModel:
+    """
+    按"楼层 × 一天中的时段"统计外部呼叫次数的滚动需求模型，增量学习、指数衰减：
+    每个时段保存一行楼层计数和最后更新时刻，读写时按距上次更新的时长惰性乘上衰减系数，
+    因此旧的需求逐渐淡出，不需要定期遍历整张表。
+    参数说明：
+    - num_floors: 楼层数
+    - slot: 时段长度（秒）
+    - period: 周期（秒），时刻按周期取模得到时段
+    - half_life: 计数的半衰期（秒）
+    """
+    def __init__(self, num_floors: int, slot: float = SLOT, period: float = DAY, half_life: float = HALF_LIFE):
+        self.num_floors = num_floors
+        self.slot = slot
+        self.period = period
+        self.half_life = half_life
+        self.num_slots = max(1, round(period / slot))
+        self.counts: List[List[float]] = [[0.0] * (num_floors + 1) for _ in range(self.num_slots)]  # 下标为楼层
+        self.updated: List[float] = [0.0] * self.num_slots
+        self.observations = 0
+
+    def slot_of(self, t: float) -> int:
+        return int(t % self.period // self.slot) % self.num_slots
+
+    def _decay(self, slot: int, t: float):
+        elapsed = t - self.updated[slot]
+        if elapsed > 0:
+            factor = 0.5 ** (elapsed / self.half_life)
+            row = self.counts[slot]
+            for floor in range(len(row)):
+                row[floor] *= factor
+        self.updated[slot] = t
+
+    def observe(self, floor: int, t: float):
+        """记录 t 时刻 floor 层的一次外部呼叫"""
+        slot = self.slot_of(t)
+        self._decay(slot, t)
+        self.counts[slot][floor] += 1.0
+        self.observations += 1
+
+    def forecast(self, t: float) -> List[float]:
+        """
+        预测 t 时刻附近各楼层的呼叫强度（下标为楼层）：上一时段、当前时段与下一时段的衰减计数之和。
+        上一时段反映刚刚发生的需求，下一时段反映往日同一时间即将到来的需求
+        """
+        slot = self.slot_of(t)
+        weights = [0.0] * (self.num_floors + 1)
+        for s in (slot - 1, slot, slot + 1):
+            s %= self.num_slots
+            factor = 0.5 ** (max(0.0, t - self.updated[s]) / self.half_life)
+            for floor, count in enumerate(self.counts[s]):
+                weights[floor] += count * factor
+        return weights
+
+
+def spread(weights: List[float], k: int) -> List[int]:
+    """
+    把 k 部空闲电梯分散到需求分布上：第 i 部停在 sqrt(需求) 累计分布的 (i + 0.5) / k 分位所在楼层。
+    一维加权 k 中位数问题中，最优停靠点的密度与需求密度的平方根成正比：
+    需求集中的楼层（早高峰的大堂）会停多部电梯，但不会把所有电梯都吸过去，其余楼层仍有电梯就近等候
+    """
+    weights = [math.sqrt(w) for w in weights]
+    total = sum(weights)
+    if total <= 0 or k <= 0:
+        return []
+    targets = []
+    cumulative, floor = 0.0, 0
+    for i in range(k):
+        quantile = (i + 0.5) / k * total
+        while floor < len(weights) - 1 and cumulative + weights[floor] < quantile:
+            cumulative += weights[floor]
+            floor += 1
+        targets.append(floor)
+    return targets
+
+
+class DemandParking:
+    """
+    空闲电梯停靠策略：电梯没有请求时不再停在原地，而是按需求预测前往"热点"楼层等候，
+    例如早高峰的大堂、晚高峰的高层。
+    - 通过 Dispatcher.on_add 学习每一次新的外部呼叫（楼层 × 时段）
+    - 空闲电梯在 Elevator.step 中调用 park_floor() 取得停靠楼层，逐层移动过去（不开门）
+    - 停靠楼层按时段缓存，同一时段内每 REFRESH_EVERY 次新观测才重新计算；
+      进入新时段时唤醒空闲电梯，让它们按新的预测重新停靠
+    参数说明：
+    - building: 大楼配置
+    - clock: 当前时刻的来源（离散事件仿真为虚拟时钟，线程模式默认为本地时间）
+    - model: 需求模型，默认按 building 新建
+    - min_observations: 模型至少学到这么多次呼叫后才开始调度空闲电梯
+    """
+    def __init__(self, building: BuildingConfig, clock: Callable[[], float] = local_clock,
+                 model: DemandModel = None, min_observations: int = 10):
+        self.building = building
+        self.clock = clock
+        self.model = model or DemandModel(building.num_floors)
+        self.min_observations = min_observations
+        self.lock = threading.Lock()  # 多个电梯线程与界面线程会同时调用
+        self.elevators = []
+        self._targets: Dict[int, int] = {}  # elevator_id -> 最近一次分配的停靠楼层
+        self._weights: Optional[List[float]] = None
+        self._cache_key = None
+        self._slot = None
+
+    def attach(self, dispatcher, elevators):
+        """订阅调度器的新呼叫，并作为各电梯的停靠策略"""
+        dispatcher.on_add = self.record
+        self.elevators = list(elevators)
+        for elevator in self.elevators:
+            elevator.parking = self
+
+    def record(self, request: Request):
+        """Dispatcher.on_add 回调：学习一次外部呼叫"""
+        now = self.clock()
+        with self.lock:
+            self.model.observe(request.floor, now)
+            slot = self.model.slot_of(now)
+            new_slot = slot != self._slot
+            self._slot = slot
+        if new_slot:
+            # 进入新时段：唤醒空闲电梯，按新的预测重新停靠
+            for elevator in self.elevators:
+                if elevator.was_idle and elevator.running:
+                    elevator.wake()
+
+    def _forecast(self, now: float) -> Optional[List[float]]:
+        """持有 lock 时调用：当前时段的需求预测（带缓存）"""
+        if self.model.observations < self.min_observations:
+            return None
+        key = (self.model.slot_of(now), self.model.observations // REFRESH_EVERY)
+        if key != self._cache_key:
+            self._weights = self.model.forecast(now)
+            self._cache_key = key
+        return self._weights
+
+    def park_floor(self, elevator) -> Optional[int]:
+        """
+        空闲电梯的停靠楼层，None 表示原地等候。
+        按空闲电梯数把需求分布切成同样多的停靠点，其它空闲电梯先各自认领离自己最近的停靠点，
+        本电梯取剩下的停靠点中离自己最近的一个
+        """
+        now = self.clock()
+        with self.lock:
+            weights = self._forecast(now)
+        if weights is None:
+            return None
+
+        idle = [e for e in self.elevators if e.running and not e.has_pending_requests()]
+        if elevator not in idle:
+            idle.append(elevator)
+        targets = spread(weights, len(idle))
+        for other in idle:
+            if other is elevator or not targets:
+                continue
+            position = self._targets.get(other.elevator_id, other.current_floor)  # 正在前往的停靠点
+            targets.remove(min(targets, key=lambda floor: abs(floor - position)))
+        if not targets:
+            return None
+        target = min(targets, key=lambda floor: abs(floor - elevator.current_floor))
+        self._targets[elevator.elevator_id] = target
+        return target
@@ -21,6 +21,9 @@ class UserIntent(Enum):
     DOWN = "DOWN"
 
 class Request:
+    # 固定字段、无 __dict__：每个请求约 64 字节（不含时间戳浮点数），高流量回放时内存与分配开销更小
+    __slots__ = ("floor", "request_type", "user_intent", "timestamp")
+
     def __init__(self, floor: int, request_type: RequestType, user_intent: UserIntent = None, timestamp: float = None):
         """
         参数说明：
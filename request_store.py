@@ -0,0 +1,171 @@
+# request_store.py
+from typing import Dict, Iterator, List, Optional, Tuple
+from request import Request, UserIntent
+
+def request_key(floor: int, intent: UserIntent) -> int:
+    """外部请求的整数键：floor * 2 + 方向位（下行为 1）。
+    代替 (floor, intent) 元组：不必每次分配元组，也不必调用枚举的 Python 层 __hash__"""
+    return floor << 1 | (intent is UserIntent.DOWN)
+
+class RequestSnapshot:
+    """
+    外部请求的不可变快照（写时复制）：
+    - requests: 按加入顺序排列的请求元组
+    - up_bits / down_bits: 楼层位图，第 k 位为 1 表示 k 层有该方向的请求
+    发布后不再修改，多个电梯线程可不加锁地并发读取
+    """
+    __slots__ = ("requests", "up_bits", "down_bits")
+
+    def __init__(self, requests: Tuple[Request, ...], up_bits: int, down_bits: int):
+        self.requests = requests
+        self.up_bits = up_bits
+        self.down_bits = down_bits
+
+    def __len__(self) -> int:
+        return len(self.requests)
+
+    def __iter__(self) -> Iterator[Request]:
+        return iter(self.requests)
+
+    def floor_bits(self, intent: UserIntent = None) -> int:
+        """楼层位图：指定方向，或所有方向的并集"""
+        if intent == UserIntent.UP:
+            return self.up_bits
+        if intent == UserIntent.DOWN:
+            return self.down_bits
+        return self.up_bits | self.down_bits
+
+    def has_floor(self, floor: int, intent: UserIntent = None) -> bool:
+        return bool(self.floor_bits(intent) >> floor & 1)
+
+    def nearest_above(self, floor: int, intent: UserIntent = None) -> Optional[int]:
+        """严格高于 floor 的最近请求楼层"""
+        higher = self.floor_bits(intent) >> (floor + 1)
+        if not higher:
+            return None
+        return floor + (higher & -higher).bit_length()
+
+    def nearest_below(self, floor: int, intent: UserIntent = None) -> Optional[int]:
+        """严格低于 floor 的最近请求楼层"""
+        lower = self.floor_bits(intent) & ((1 << floor) - 1)
+        if not lower:
+            return None
+        return lower.bit_length() - 1
+
+
+class RequestStore:
+    """
+    外部请求索引（楼层 × 用户方向），仅由持有写锁的写者修改：
+    - _requests: request_key(floor, intent) -> Request，按插入顺序保存，O(1) 去重与删除
+    - _up_bits / _down_bits: 每个方向一个楼层位图
+    每次写入后通过 snapshot() 生成不可变快照供读者使用
+    """
+    __slots__ = ("_requests", "_up_bits", "_down_bits")
+
+    def __init__(self):
+        self._requests: Dict[int, Request] = {}
+        self._up_bits = 0
+        self._down_bits = 0
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    def __iter__(self) -> Iterator[Request]:
+        return iter(self._requests.values())
+
+    def __contains__(self, request: Request) -> bool:
+        return request_key(request.floor, request.user_intent) in self._requests
+
+    def get(self, floor: int, intent: UserIntent) -> Optional[Request]:
+        return self._requests.get(request_key(floor, intent))
+
+    def add(self, request: Request) -> bool:
+        """添加请求，重复（同楼层同方向）时返回 False"""
+        key = request_key(request.floor, request.user_intent)
+        if key in self._requests:
+            return False
+        self._requests[key] = request
+        if key & 1:
+            self._down_bits |= 1 << request.floor
+        else:
+            self._up_bits |= 1 << request.floor
+        return True
+
+    def remove(self, floor: int, intent: UserIntent) -> Optional[Request]:
+        """移除指定楼层、指定方向的请求，返回被移除的请求（没有则返回 None）"""
+        key = request_key(floor, intent)
+        request = self._requests.pop(key, None)
+        if request is not None:
+            if key & 1:
+                self._down_bits &= ~(1 << floor)
+            else:
+                self._up_bits &= ~(1 << floor)
+        return request
+
+    def remove_floor(self, floor: int) -> List[Request]:
+        """移除指定楼层所有方向的请求"""
+        removed = []
+        for intent in (UserIntent.UP, UserIntent.DOWN):
+            request = self.remove(floor, intent)
+            if request is not None:
+                removed.append(request)
+        return removed
+
+    def floor_bits(self) -> int:
+        """所有方向请求楼层位图的并集"""
+        return self._up_bits | self._down_bits
+
+    def snapshot(self) -> RequestSnapshot:
+        return RequestSnapshot(tuple(self._requests.values()), self._up_bits, self._down_bits)
+
+
+class CabinRequests:
+    """
+    单部电梯的内部请求（轿厢内楼层按钮），每层至多一个：
+    - _requests: floor -> Request，按按下顺序保存（保留时间戳供统计与"最早请求"使用）
+    - bits: 楼层位图，第 k 位为 1 表示 k 层按钮亮起
+    去重、清除一层、楼上/楼下最近的请求都是 O(1) 位运算或字典操作
+    """
+    __slots__ = ("_requests", "bits")
+
+    def __init__(self):
+        self._requests: Dict[int, Request] = {}
+        self.bits = 0
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    def __iter__(self) -> Iterator[Request]:
+        return iter(self._requests.values())
+
+    def __contains__(self, floor: int) -> bool:
+        return bool(self.bits >> floor & 1)
+
+    def add(self, request: Request) -> bool:
+        """添加请求，该层已有请求时返回 False"""
+        if self.bits >> request.floor & 1:
+            return False
+        self._requests[request.floor] = request
+        self.bits |= 1 << request.floor
+        return True
+
+    def remove(self, floor: int) -> Optional[Request]:
+        """清除指定楼层的请求，返回被清除的请求（没有则返回 None）"""
+        if not self.bits >> floor & 1:
+            return None
+        self.bits &= ~(1 << floor)
+        return self._requests.pop(floor)
+
+    def nearest_above(self, floor: int) -> Optional[int]:
+        """严格高于 floor 的最近请求楼层"""
+        higher = self.bits >> (floor + 1)
+        if not higher:
+            return None
+        return floor + (higher & -higher).bit_length()
+
+    def nearest_below(self, floor: int) -> Optional[int]:
+        """严格低于 floor 的最近请求楼层"""
+        lower = self.bits & ((1 << floor) - 1)
+        if not lower:
+            return None
+        return lower.bit_length() - 1
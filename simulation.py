@@ -0,0 +1,206 @@
+# simulation.py
+import heapq
+import itertools
+import random
+import time
+from functools import partial
+from typing import Callable, Optional
+
+from building import BuildingConfig, DEFAULT_BUILDING
+from request import Request, RequestType, UserIntent
+from dispatcher import Dispatcher, DispatchPolicy
+from elevator import Elevator, TICK_INTERVAL
+from log_writer import LogWriter
+from metrics import Metrics
+from parking import DemandParking
+
+DAY = 24 * 3600  # 一天的仿真时长（秒）
+TIME_DIGITS = 9   # 虚拟时刻保留的小数位：消除浮点累加误差，同一时刻的事件按排入顺序处理
+
+class Simulation:
+    """
+    离散事件仿真引擎：虚拟时钟 + 事件优先队列。
+    直接驱动 Elevator.step() 生成器，调度逻辑与线程模式完全相同，
+    只是把每段耗时动作换成"在虚拟时钟上排一个后续事件"，不再真实休眠。
+    """
+    def __init__(self, building: BuildingConfig = DEFAULT_BUILDING, logger: Optional[LogWriter] = None,
+                 policy: DispatchPolicy = DispatchPolicy.SHARED, start: float = 0.0, parking: bool = False):
+        """
+        参数说明：
+        - building: 大楼配置（电梯数、楼层数）
+        - policy: 外部请求的调度策略
+        - logger: 电梯运行日志写入器，默认不写日志
+        - start: 虚拟时钟的起点（从检查点恢复时为保存时刻）
+        - parking: 是否启用按需求预测的空闲电梯停靠（parking.DemandParking）
+        """
+        self.now = start
+        self.building = building
+        self.num_floors = building.num_floors
+        self.dispatcher = Dispatcher(verbose=False, policy=policy, building=building)
+        self.elevators = [Elevator(eid, self.dispatcher, logger=logger) for eid in building.elevator_ids()]
+        for elevator in self.elevators:
+            elevator.on_wake = self._wake
+        self.events_processed = 0
+
+        # 乘客级指标：候梯时间、乘梯时间（按虚拟时钟计）
+        self.stats = Metrics(clock=lambda: self.now)
+        self.stats.attach(self.dispatcher, self.elevators)
+
+        # 空闲停靠：按虚拟时钟上的"一天中的时段"学习呼叫需求
+        self.parking = None
+        if parking:
+            self.parking = DemandParking(building, clock=lambda: self.now)
+            self.parking.attach(self.dispatcher, self.elevators)
+
+        self._events = []                 # 事件堆：(虚拟时刻, 序号, 动作)
+        self._seq = itertools.count()     # 同一时刻按入队顺序执行
+        self._steps = {}                  # elevator_id -> 正在执行的 step 生成器
+        self._parked = set()              # 空闲等待唤醒的电梯
+
+        for elevator in self.elevators:
+            self.schedule(start, partial(self._resume, elevator))
+
+    def schedule(self, at: float, action: Callable[[], None]):
+        """在虚拟时刻 at 执行 action"""
+        heapq.heappush(self._events, (round(at, TIME_DIGITS), next(self._seq), action))
+
+    def call(self, at: float, floor: int, request_type: RequestType,
+             user_intent: UserIntent = None, elevator_id: int = None):
+        """在虚拟时刻 at 发出一个请求（内部请求需指定 elevator_id）"""
+        def _submit():
+            request = Request(floor, request_type, user_intent, timestamp=self.now)
+            self.submit(request, elevator_id)
+        self.schedule(at, _submit)
+
+    def submit(self, request: Request, elevator_id: int = None):
+        """
+        立即提交请求：内部请求交给指定电梯，外部请求交给调度器（elevator_id 为用户呼叫的电梯）。
+        电梯号在记录指标之前校验：内部请求必须指定，指定时须在 1..电梯数 内，否则抛出 ValueError
+        """
+        if elevator_id is None:
+            if request.request_type == RequestType.INTERNAL:
+                raise ValueError(f"内部请求需指定电梯号: {request}")
+        elif not 1 <= elevator_id <= len(self.elevators):
+            raise ValueError(f"电梯号超出范围 1..{len(self.elevators)}: {request}")
+        self.stats.record_request(request)
+        if request.request_type == RequestType.INTERNAL:
+            self.elevators[elevator_id - 1].add_request(request)
+        else:
+            self.dispatcher.add_request(request, elevator_id)
+
+    def _wake(self, elevator: Elevator):
+        """Elevator.on_wake 回调：把挂起的空闲电梯重新排入事件队列"""
+        if elevator in self._parked:
+            self._parked.discard(elevator)
+            self.schedule(self.now, partial(self._resume, elevator))
+
+    def _resume(self, elevator: Elevator):
+        """推进一部电梯：继续当前 step，或在上一步结束后开始新的一步"""
+        step = self._steps.pop(elevator.elevator_id, None)
+        if step is None:
+            if not elevator.running:
+                return
+            step = elevator.step()
+
+        try:
+            delay = next(step)
+        except StopIteration:
+            if elevator.was_idle:
+                self._parked.add(elevator)  # 空闲：挂起，直到有新请求再唤醒
+            else:
+                self.schedule(self.now + TICK_INTERVAL, partial(self._resume, elevator))
+            return
+
+        self._steps[elevator.elevator_id] = step
+        self.schedule(self.now + delay, partial(self._resume, elevator))
+
+    def run(self, until: float = None, speed: float = None) -> float:
+        """
+        运行仿真直到事件耗尽或虚拟时刻超过 until。
+        - speed=None: 无界面模式，尽可能快地推进虚拟时钟
+        - speed=1.0: 实时模式（与线程版、Gradio 界面节奏一致），>1 为加速回放
+        返回当前虚拟时刻
+        """
+        start_now = self.now
+        wall_start = time.perf_counter()
+        while self._events:
+            at = self._events[0][0]
+            if until is not None and at > until:
+                break
+            _, _, action = heapq.heappop(self._events)
+
+            if speed:
+                lag = (at - start_now) / speed - (time.perf_counter() - wall_start)
+                if lag > 0:
+                    time.sleep(lag)
+
+            self.now = at
+            action()
+            self.events_processed += 1
+
+        if until is not None:
+            self.now = max(self.now, until)
+        return self.now
+
+    def pending_requests(self) -> int:
+        """尚未被响应的请求数（外部 + 所有电梯内部）"""
+        return len(self.dispatcher.get_requests()) + sum(len(e.internal_requests) for e in self.elevators)
+
+    def metrics(self) -> dict:
+        """本次仿真的汇总指标（时间单位：秒）"""
+        summary = self.stats.summary()
+        wait, ride = summary["wait"], summary["ride"]
+        return {
+            "sim_time": self.now,
+            "events": self.events_processed,
+            "requests": summary["requests"],
+            "hall_calls_served": wait["count"],
+            "mean_wait": round(wait["mean"], 3),
+            "p50_wait": round(wait["p50"], 3),
+            "p95_wait": round(wait["p95"], 3),
+            "p99_wait": round(wait["p99"], 3),
+            "max_wait": round(wait["max"], 3),
+            "mean_ride": round(ride["mean"], 3),
+            "p95_ride": round(ride["p95"], 3),
+            "throughput_per_hour": round(summary["throughput_per_hour"], 1),
+            "pending": self.pending_requests(),
+        }
+
+    def dump_metrics(self, path: str, interval: float = 3600.0):
+        """每隔 interval 秒虚拟时间把指标汇总追加到 path（JSON Lines）；事件队列耗尽后不再排程"""
+        def _dump():
+            self.stats.dump(path)
+            if self._events:
+                self.schedule(self.now + interval, _dump)
+        self.schedule(self.now + interval, _dump)
+
+
+def add_random_calls(sim: Simulation, duration: float, mean_interval: float = 30.0, seed: int = None):
+    """按泊松到达在 [0, duration) 内随机生成内外请求，用于演示与压测"""
+    rng = random.Random(seed)
+    t = rng.expovariate(1 / mean_interval)
+    while t < duration:
+        floor = rng.randint(1, sim.num_floors)
+        if rng.random() < 0.5:
+            if floor == 1:
+                intent = UserIntent.UP
+            elif floor == sim.num_floors:
+                intent = UserIntent.DOWN
+            else:
+                intent = rng.choice((UserIntent.UP, UserIntent.DOWN))
+            sim.call(t, floor, RequestType.EXTERNAL, intent)
+        else:
+            sim.call(t, floor, RequestType.INTERNAL, elevator_id=rng.randint(1, len(sim.elevators)))
+        t += rng.expovariate(1 / mean_interval)
+
+
+if __name__ == "__main__":
+    sim = Simulation(BuildingConfig(num_elevators=5, num_floors=20))
+    add_random_calls(sim, DAY, seed=42)
+
+    wall_start = time.perf_counter()
+    sim.run(until=DAY)
+    wall = time.perf_counter() - wall_start
+
+    print(f"仿真时长 {sim.now / 3600:.1f} 小时，处理事件 {sim.events_processed} 个，"
+          f"耗时 {wall:.2f} 秒，剩余未响应请求 {sim.pending_requests()} 个")
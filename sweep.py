@@ -0,0 +1,94 @@
+# sweep.py
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List
+
+from building import BuildingConfig
+from dispatcher import DispatchPolicy
+from simulation import Simulation, add_random_calls
+from traffic import add_traffic
+
+# 交通流配置：名称 -> 生成函数 (sim, duration, seed)
+TRAFFIC_PROFILES = {
+    "light": partial(add_random_calls, mean_interval=60.0),
+    "normal": partial(add_random_calls, mean_interval=30.0),
+    "heavy": partial(add_random_calls, mean_interval=10.0),
+    "up_peak": partial(add_traffic, pattern="up_peak", mean_interval=10.0),
+    "down_peak": partial(add_traffic, pattern="down_peak", mean_interval=10.0),
+    "lunch": partial(add_traffic, pattern="lunch", mean_interval=15.0),
+    "interfloor": partial(add_traffic, pattern="interfloor", mean_interval=30.0),
+}
+
+def build_grid(elevators: List[int], floors: List[int], traffic: List[str], policies: List[str],
+               seeds: List[int], duration: float, parking: List[bool] = (False,)) -> List[Dict]:
+    """生成场景网格：电梯数 × 楼层数 × 交通流 × 调度策略 × 空闲停靠 × 随机种子"""
+    for name in traffic:
+        if name not in TRAFFIC_PROFILES:
+            raise ValueError(f"未知的交通流配置: {name}")
+    return [
+        {"num_elevators": e, "num_floors": f, "traffic": t, "policy": p, "parking": k, "seed": s, "duration": duration}
+        for e, f, t, p, k, s in itertools.product(elevators, floors, traffic, policies, parking, seeds)
+    ]
+
+def run_scenario(scenario: Dict) -> Dict:
+    """在当前进程中运行一个无界面仿真场景，返回场景参数与指标合并后的一行结果"""
+    building = BuildingConfig(scenario["num_elevators"], scenario["num_floors"])
+    sim = Simulation(building, policy=DispatchPolicy[scenario["policy"]], parking=scenario.get("parking", False))
+    TRAFFIC_PROFILES[scenario["traffic"]](sim, scenario["duration"], seed=scenario["seed"])
+
+    wall_start = time.perf_counter()
+    sim.run(until=scenario["duration"])
+    wall = time.perf_counter() - wall_start
+
+    return {**scenario, **sim.metrics(), "wall_time": round(wall, 3)}
+
+def run_sweep(scenarios: List[Dict], workers: int = None) -> List[Dict]:
+    """把场景分发到进程池，每个进程独立运行一个仿真（各自持有全局状态），按场景顺序返回结果"""
+    if workers == 1:
+        return [run_scenario(s) for s in scenarios]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_scenario, scenarios))
+
+def write_table(rows: List[Dict], output=None):
+    """结果表写为 CSV（output 为空时写到标准输出）"""
+    if not rows:
+        return
+    out = open(output, "w", newline="", encoding="utf-8") if output else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if output:
+            out.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多进程参数扫描：并行运行多个无界面电梯仿真并汇总指标")
+    parser.add_argument("--elevators", type=int, nargs="+", default=[3, 5], help="电梯数")
+    parser.add_argument("--floors", type=int, nargs="+", default=[20], help="楼层数")
+    parser.add_argument("--traffic", nargs="+", default=["normal"], choices=sorted(TRAFFIC_PROFILES), help="交通流配置")
+    parser.add_argument("--policy", nargs="+", default=["SHARED", "ETA"],
+                        choices=[p.name for p in DispatchPolicy], help="调度策略")
+    parser.add_argument("--parking", nargs="+", default=["off"], choices=["off", "demand"],
+                        help="空闲停靠：off 为原地等候，demand 为按需求预测停靠")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0], help="随机种子")
+    parser.add_argument("--duration", type=float, default=3600.0, help="每个场景的仿真时长（秒）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="进程数")
+    parser.add_argument("--output", help="结果 CSV 文件（默认输出到终端）")
+    args = parser.parse_args(argv)
+
+    parking = [mode == "demand" for mode in args.parking]
+    scenarios = build_grid(args.elevators, args.floors, args.traffic, args.policy, args.seeds, args.duration, parking)
+    wall_start = time.perf_counter()
+    rows = run_sweep(scenarios, args.workers)
+    write_table(rows, args.output)
+    print(f"完成 {len(rows)} 个场景，耗时 {time.perf_counter() - wall_start:.2f} 秒", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
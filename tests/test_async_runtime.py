@@ -0,0 +1,63 @@
+# tests/test_async_runtime.py
+"""asyncio 运行时：在后台事件循环中驱动电梯、跨线程唤醒空闲电梯，以及 stop / cancel 后的退出。"""
+import threading
+
+from async_runtime import AsyncRuntime
+from building import BuildingConfig
+from dispatcher import Dispatcher
+from elevator import Elevator
+from request import Request, RequestType, UserIntent
+
+
+def _runtime(num_elevators: int = 2):
+    building = BuildingConfig(num_elevators=num_elevators, num_floors=5)
+    dispatcher = Dispatcher(verbose=False, building=building)
+    elevators = [Elevator(eid, dispatcher, logger=None) for eid in building.elevator_ids()]
+    return AsyncRuntime(elevators), dispatcher, elevators
+
+def _served_event(elevators, dispatcher, count: int) -> threading.Event:
+    """累计响应 count 个请求时 set 的事件"""
+    served, done, lock = [], threading.Event(), threading.Lock()
+
+    def record(requests, elevator_id):
+        with lock:
+            served.extend(requests)
+            if len(served) >= count:
+                done.set()
+    dispatcher.on_remove = record
+    for elevator in elevators:
+        elevator.on_remove = record
+    return done
+
+
+def test_idle_cars_are_woken_from_other_threads():
+    runtime, dispatcher, elevators = _runtime()
+    done = _served_event(elevators, dispatcher, 2)
+    runtime.start()
+    try:
+        elevators[0].add_request(Request(2, RequestType.INTERNAL))
+        dispatcher.add_request(Request(2, RequestType.EXTERNAL, UserIntent.UP))
+        assert done.wait(10.0)
+        assert not elevators[0].internal_requests and not dispatcher.get_requests()
+    finally:
+        runtime.stop()
+        runtime.join(10.0)
+    assert not runtime._thread.is_alive()
+    assert all(elevator.on_wake is None for elevator in elevators)
+
+def test_stop_exits_idle_cars():
+    runtime, dispatcher, elevators = _runtime()
+    runtime.start()
+    runtime.stop()
+    runtime.join(10.0)
+    assert not runtime._thread.is_alive()
+    assert not any(elevator.running for elevator in elevators)
+
+def test_cancel_does_not_wait_for_the_current_action():
+    runtime, _, elevators = _runtime(1)
+    runtime.start()
+    elevators[0].add_request(Request(5, RequestType.INTERNAL))  # 需要移动数秒
+    runtime.cancel()
+    runtime.join(1.0)
+    assert not runtime._thread.is_alive()
+    assert 5 in elevators[0].internal_requests
@@ -0,0 +1,57 @@
+# tests/test_batch_simulation.py
+"""向量化批量仿真与离散事件仿真（SHARED 策略）逐栋比对：相同的请求流应得到相同的统计结果。"""
+import numpy as np
+import pytest
+
+from batch_simulation import CABIN, DOWN, HALL_DOWN, HALL_UP, UP, BatchSimulation, poisson_calls
+from building import BuildingConfig
+from request import RequestType, UserIntent
+from simulation import Simulation
+
+DURATION = 3600.0
+
+
+def _event_simulation(calls, num_elevators: int, num_floors: int) -> Simulation:
+    """按 BatchSimulation 的注入顺序（时间稳定排序）把同一请求流排入离散事件仿真"""
+    times, _, floors, kinds, cars = calls
+    sim = Simulation(BuildingConfig(num_elevators=num_elevators, num_floors=num_floors))
+    for i in np.argsort(np.round(times / 0.1), kind="stable"):
+        if kinds[i] == CABIN:
+            sim.call(float(times[i]), int(floors[i]), RequestType.INTERNAL, elevator_id=int(cars[i]) + 1)
+        else:
+            intent = UserIntent.UP if kinds[i] == HALL_UP else UserIntent.DOWN
+            sim.call(float(times[i]), int(floors[i]), RequestType.EXTERNAL, intent)
+    return sim
+
+
+@pytest.mark.parametrize("num_elevators, num_floors, mean_interval", [(1, 15, 5.0), (4, 15, 10.0), (6, 15, 5.0), (6, 30, 5.0)])
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_event_simulation(num_elevators, num_floors, mean_interval, seed):
+    calls = poisson_calls(1, DURATION, mean_interval, num_elevators, num_floors, seed=seed)
+    batch = BatchSimulation(1, num_elevators, num_floors)
+    batch.add_calls(*calls)
+    batch.run(DURATION + 600)
+    sim = _event_simulation(calls, num_elevators, num_floors)
+    sim.run(until=DURATION + 600)
+
+    result = batch.summary()
+    assert result["served_calls"][0] == sim.stats.wait.count
+    assert result["mean_wait"][0] == pytest.approx(sim.stats.wait.mean(), abs=1e-9)
+    assert result["pending"][0] == sim.pending_requests()
+
+def _idle_at_five(*calls):
+    """一部电梯停在 5 层空闲，t=30 秒时同时到达 calls（按给出的顺序加入），返回它选择的出发方向"""
+    batch = BatchSimulation(1, 1, 10)
+    batch.add_calls([0.0], [0], [5], [CABIN], [0])
+    batch.run(29.0)
+    floors, kinds = zip(*calls)
+    batch.add_calls([30.0] * len(calls), [0] * len(calls), floors, kinds, [0] * len(calls))
+    batch.run(30.0)
+    return batch.direction[0]
+
+def test_earliest_request_ties_follow_insertion_order():
+    # 同一时刻：内部请求优先，外部请求按加入顺序（与 Elevator._earliest_request 一致）
+    assert _idle_at_five((8, HALL_UP), (2, CABIN)) == DOWN
+    assert _idle_at_five((2, HALL_DOWN), (8, HALL_UP)) == DOWN
+    assert _idle_at_five((8, HALL_UP), (2, HALL_DOWN)) == UP
+    assert _idle_at_five((8, CABIN), (2, CABIN)) == UP
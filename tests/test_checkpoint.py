@@ -0,0 +1,113 @@
+# tests/test_checkpoint.py
+"""检查点：二进制格式的往返、恢复到调度器与电梯、损坏文件一律抛出 ValueError。"""
+import random
+
+import pytest
+
+from building import BuildingConfig
+from checkpoint import (_CALL, _CAR, _COUNT, _HEADER, MAGIC, Checkpoint, fork, load, load_simulation,
+                        save, save_simulation)
+from dispatcher import DispatchPolicy
+from request import Direction, UserIntent
+from simulation import Simulation, add_random_calls
+
+
+def _warm_simulation(policy: DispatchPolicy = DispatchPolicy.ETA) -> Simulation:
+    """运行到中途、仍有未响应请求的仿真"""
+    sim = Simulation(BuildingConfig(num_elevators=4, num_floors=15), policy=policy)
+    add_random_calls(sim, 600.0, mean_interval=2.0, seed=7)
+    sim.run(until=300.0)
+    return sim
+
+def _fields(checkpoint: Checkpoint):
+    cars = [(c.floor, c.direction, c.history_direction, c.door_open, c.was_idle, c.cabin) for c in checkpoint.cars]
+    return (checkpoint.building.num_elevators, checkpoint.building.num_floors, checkpoint.policy,
+            checkpoint.now, cars, checkpoint.calls)
+
+
+@pytest.mark.parametrize("policy", list(DispatchPolicy))
+def test_bytes_round_trip(policy):
+    sim = _warm_simulation(policy)
+    checkpoint = Checkpoint.capture(sim.dispatcher, sim.elevators, sim.now)
+    assert checkpoint.calls and any(car.cabin for car in checkpoint.cars)
+    assert _fields(Checkpoint.from_bytes(checkpoint.to_bytes())) == _fields(checkpoint)
+
+def test_file_round_trip_restores_state(tmp_path):
+    sim = _warm_simulation(DispatchPolicy.MANUAL)
+    path = str(tmp_path / "state.ckpt")
+    save_simulation(sim, path)
+    restored = load_simulation(path)
+    assert restored.now == sim.now
+    for old, new in zip(sim.elevators, restored.elevators):
+        assert (new.current_floor, new.direction, new.door_open) == (old.current_floor, old.direction, old.door_open)
+        assert [(r.floor, r.timestamp) for r in new.internal_requests] == \
+               [(r.floor, r.timestamp) for r in old.internal_requests]
+    old_calls = [(r.floor, r.user_intent, sim.dispatcher.owner(r.floor, r.user_intent)) for r in sim.dispatcher.get_requests()]
+    new_calls = [(r.floor, r.user_intent, restored.dispatcher.owner(r.floor, r.user_intent))
+                 for r in restored.dispatcher.get_requests()]
+    assert new_calls == old_calls  # MANUAL 保留原来的负责电梯
+    assert not (tmp_path / "state.ckpt.tmp").exists()
+    assert _fields(load(path)) == _fields(Checkpoint.capture(sim.dispatcher, sim.elevators, sim.now))
+
+def test_fork_runs_independently():
+    sim = _warm_simulation()
+    copy = fork(sim)
+    copy.run(until=2000.0)
+    assert copy.pending_requests() == 0
+    assert sim.pending_requests() > 0
+
+def test_apply_rejects_other_building():
+    sim = _warm_simulation()
+    checkpoint = Checkpoint.capture(sim.dispatcher, sim.elevators, sim.now)
+    other = Simulation(BuildingConfig(num_elevators=4, num_floors=20))
+    with pytest.raises(ValueError):
+        checkpoint.apply(other.dispatcher, other.elevators)
+
+
+# ========== 损坏的文件 ==========
+def _valid_bytes() -> bytes:
+    sim = _warm_simulation()
+    return Checkpoint.capture(sim.dispatcher, sim.elevators, sim.now).to_bytes()
+
+def test_every_truncation_is_rejected():
+    data = _valid_bytes()
+    for length in range(len(data)):
+        with pytest.raises(ValueError):
+            Checkpoint.from_bytes(data[:length])
+
+def test_trailing_data_is_rejected():
+    with pytest.raises(ValueError, match="多余数据"):
+        Checkpoint.from_bytes(_valid_bytes() + b"\0")
+
+def test_bad_magic_and_version():
+    data = _valid_bytes()
+    with pytest.raises(ValueError, match="不是电梯检查点"):
+        Checkpoint.from_bytes(b"XXXX" + data[4:])
+    magic, version, *rest = _HEADER.unpack_from(data)
+    with pytest.raises(ValueError, match="版本"):
+        Checkpoint.from_bytes(_HEADER.pack(magic, version + 1, *rest) + data[_HEADER.size:])
+
+def _minimal(policy=0, direction=0, intent=0) -> bytes:
+    """一部电梯、一个外部请求的最小检查点，可指定各枚举字段的编码"""
+    return (_HEADER.pack(MAGIC, 1, 1, 10, policy, 0.0) + _CAR.pack(1, direction, 0, 0, 0)
+            + _COUNT.pack(1) + _CALL.pack(5, intent, 0, 0.0))
+
+def test_unknown_codes_are_rejected():
+    checkpoint = Checkpoint.from_bytes(_minimal())
+    assert checkpoint.cars[0].direction == Direction.NONE
+    assert checkpoint.calls == [(5, UserIntent.UP, None, 0.0)]
+    for fields in ({"policy": 3}, {"direction": 3}, {"intent": 2}, {"policy": 255}):
+        with pytest.raises(ValueError, match="未知的"):
+            Checkpoint.from_bytes(_minimal(**fields))
+
+def test_garbage_only_raises_value_error():
+    rng = random.Random(0)
+    data = bytearray(_valid_bytes())
+    for _ in range(2000):
+        corrupted = bytearray(data)
+        for _ in range(rng.randint(1, 4)):
+            corrupted[rng.randrange(_HEADER.size, len(corrupted))] = rng.randrange(256)
+        try:
+            Checkpoint.from_bytes(bytes(corrupted))
+        except ValueError:
+            pass
@@ -0,0 +1,125 @@
+# tests/test_dispatcher.py
+"""调度器：外部请求的索引与去重、ETA 分配、增量改派、停运改派，以及空闲电梯只响应自己负责的请求。"""
+import pytest
+
+from building import BuildingConfig
+from dispatcher import Dispatcher, DispatchPolicy
+from elevator import Elevator
+from request import Direction, Request, RequestType, UserIntent
+
+
+def _building(policy: DispatchPolicy, floors=(1, 1, 1)):
+    """一栋 20 层、len(floors) 部电梯的大楼，各电梯停在指定楼层（均未启动线程）"""
+    building = BuildingConfig(num_elevators=len(floors), num_floors=20)
+    dispatcher = Dispatcher(verbose=False, policy=policy, building=building)
+    elevators = [Elevator(eid, dispatcher, logger=None) for eid in building.elevator_ids()]
+    for elevator, floor in zip(elevators, floors):
+        elevator.current_floor = floor
+    return dispatcher, elevators
+
+def _call(floor: int, intent: UserIntent = UserIntent.UP) -> Request:
+    return Request(floor, RequestType.EXTERNAL, intent, timestamp=0.0)
+
+
+def test_duplicate_hall_call_is_ignored():
+    dispatcher, _ = _building(DispatchPolicy.SHARED)
+    dispatcher.add_request(_call(5))
+    dispatcher.add_request(_call(5))
+    dispatcher.add_request(_call(5, UserIntent.DOWN))
+    assert len(dispatcher.get_requests()) == 2
+    assert dispatcher.nearest_above(1) == 5 and dispatcher.nearest_below(10) == 5
+
+def test_out_of_range_call_is_rejected():
+    dispatcher, _ = _building(DispatchPolicy.SHARED)
+    with pytest.raises(ValueError):
+        dispatcher.add_request(_call(21))
+
+def test_eta_assigns_call_to_nearest_car():
+    dispatcher, _ = _building(DispatchPolicy.ETA, floors=(1, 10, 20))
+    dispatcher.add_request(_call(9))
+    assert dispatcher.owner(9, UserIntent.UP) == 2
+    assert [r.floor for r in dispatcher.get_requests(2)] == [9]
+    assert not dispatcher.has_requests(1) and not dispatcher.has_requests(3)
+
+def test_manual_keeps_the_called_car():
+    dispatcher, _ = _building(DispatchPolicy.MANUAL, floors=(1, 10, 20))
+    dispatcher.add_request(_call(9), 3)
+    assert dispatcher.owner(9, UserIntent.UP) == 3
+
+def test_stopping_car_takes_over_calls_it_reaches_much_sooner():
+    dispatcher, elevators = _building(DispatchPolicy.ETA, floors=(1, 20, 20))
+    dispatcher.add_request(_call(8))
+    assert dispatcher.owner(8, UserIntent.UP) == 1
+    # 2 号电梯在 7 层停靠（状态变化），它比 1 号快出 REASSIGN_MARGIN 以上，请求改派给它
+    elevators[1].current_floor = 7
+    elevators[1].direction = Direction.UP
+    dispatcher.remove_request(7, 2, UserIntent.UP)
+    assert dispatcher.owner(8, UserIntent.UP) == 2
+    assert [r.floor for r in dispatcher.get_requests(2)] == [8]
+    assert not dispatcher.has_requests(1)
+
+def test_small_gain_does_not_reassign():
+    dispatcher, elevators = _building(DispatchPolicy.ETA, floors=(10, 20, 20))
+    dispatcher.add_request(_call(15))
+    assert dispatcher.owner(15, UserIntent.UP) == 1
+    elevators[1].current_floor = 11
+    elevators[1].direction = Direction.UP
+    dispatcher.remove_request(11, 2, UserIntent.UP)
+    assert dispatcher.owner(15, UserIntent.UP) == 1
+
+def test_stale_moves_are_skipped():
+    dispatcher, elevators = _building(DispatchPolicy.ETA, floors=(1, 20, 20))
+    dispatcher.add_request(_call(8))
+    elevators[1].current_floor = 7
+    elevators[1].direction = Direction.UP
+    moves = dispatcher._plan_rebalance(2)
+    assert moves
+    dispatcher.remove_request(8, 1, UserIntent.UP)  # 计算方案之后请求已被响应
+    with dispatcher.w_mutex:
+        assert dispatcher._apply_moves(moves) == set()
+    assert not dispatcher.get_requests()
+
+def test_release_reassigns_calls_of_stopped_car():
+    dispatcher, elevators = _building(DispatchPolicy.ETA, floors=(1, 10, 20))
+    dispatcher.add_request(_call(9))
+    elevators[1].stop()
+    assert dispatcher.owner(9, UserIntent.UP) in (1, 3)
+    assert not dispatcher.has_requests(2)
+
+def test_stop_without_release_keeps_owner():
+    dispatcher, elevators = _building(DispatchPolicy.MANUAL, floors=(1, 10, 20))
+    dispatcher.add_request(_call(9), 3)
+    for elevator in elevators:
+        elevator.stop(release=False)
+    assert dispatcher.owner(9, UserIntent.UP) == 3
+
+def test_idle_car_does_not_clear_calls_owned_by_other_cars():
+    dispatcher, elevators = _building(DispatchPolicy.MANUAL, floors=(5, 10, 20))
+    dispatcher.add_request(_call(5, UserIntent.UP), 2)
+    dispatcher.add_request(_call(5, UserIntent.DOWN))  # MANUAL 未指定电梯：按 ETA 分配给本层的 1 号
+    assert dispatcher.owner(5, UserIntent.DOWN) == 1
+    assert dispatcher.remove_request(5, 1) is True
+    assert [(r.floor, r.user_intent) for r in dispatcher.get_requests()] == [(5, UserIntent.UP)]
+    assert dispatcher.owner(5, UserIntent.UP) == 2
+
+def test_idle_car_clears_whole_floor_when_shared():
+    dispatcher, _ = _building(DispatchPolicy.SHARED)
+    dispatcher.add_request(_call(5, UserIntent.UP))
+    dispatcher.add_request(_call(5, UserIntent.DOWN))
+    assert dispatcher.remove_request(5, 1) is True
+    assert not dispatcher.get_requests()
+
+def test_moving_car_clears_only_its_direction():
+    dispatcher, _ = _building(DispatchPolicy.SHARED)
+    dispatcher.add_request(_call(5, UserIntent.UP))
+    dispatcher.add_request(_call(5, UserIntent.DOWN))
+    dispatcher.remove_request(5, 1, UserIntent.UP)
+    assert [r.user_intent for r in dispatcher.get_requests()] == [UserIntent.DOWN]
+
+def test_on_remove_reports_served_calls():
+    dispatcher, _ = _building(DispatchPolicy.SHARED)
+    served = []
+    dispatcher.on_remove = lambda requests, elevator_id: served.append(([r.floor for r in requests], elevator_id))
+    dispatcher.add_request(_call(7))
+    dispatcher.remove_request(7, 2, UserIntent.UP)
+    assert served == [([7], 2)]
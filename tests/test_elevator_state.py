@@ -0,0 +1,87 @@
+# tests/test_elevator_state.py
+"""界面状态管理器：序号令牌的变化检测（changes_since / wait_for_change）与无锁读取的一致性。"""
+import threading
+
+from building import BuildingConfig
+from gui.elevator_state import ElevatorStateManager
+from request import Direction, UserIntent
+
+
+def _manager() -> ElevatorStateManager:
+    return ElevatorStateManager(BuildingConfig(num_elevators=3, num_floors=10))
+
+
+def test_first_read_asks_for_full_refresh():
+    token, elevators, floors = _manager().changes_since(None)
+    assert token is not None and elevators is None and floors is None
+
+def test_changes_are_reported_per_elevator_and_floor():
+    state = _manager()
+    token, _, _ = state.changes_since(None)
+    assert state.changes_since(token)[1:] == (set(), set())
+
+    state.update_elevator(2, 5, Direction.UP, False)
+    state.set_internal_button(3, 7, True)
+    state.set_external_button(4, UserIntent.DOWN, True)
+    token, elevators, floors = state.changes_since(token)
+    assert elevators == {2, 3} and floors == {4}
+    assert state.elevator(2) == {"floor": 5, "direction": Direction.UP, "door_open": False, "internal_buttons": set()}
+    assert state.elevator(3)["internal_buttons"] == {7}
+    assert state.get_snapshot()["external_buttons"][4] == {"UP": False, "DOWN": True}
+
+    # 状态未变的重复写入不算变化
+    state.update_elevator(2, 5, Direction.UP, False)
+    state.set_internal_button(3, 7, True)
+    state.set_external_button(4, UserIntent.DOWN, True)
+    assert state.changes_since(token)[1:] == (set(), set())
+
+    state.set_external_button(4, UserIntent.DOWN, False)
+    state.set_external_button(4, UserIntent.UP, True)  # 同一层一灭一亮：按钮位图不同即为变化
+    assert state.changes_since(token)[1:] == (set(), {4})
+
+def test_configure_invalidates_old_tokens():
+    state = _manager()
+    token, _, _ = state.changes_since(None)
+    state.configure(BuildingConfig(num_elevators=4, num_floors=10))
+    _, elevators, _ = state.changes_since(token)
+    assert elevators == {1, 2, 3, 4}
+
+def test_wait_for_change():
+    state = _manager()
+    token, _, _ = state.changes_since(None)
+    assert state.wait_for_change(token, timeout=0.05) is False
+    timer = threading.Timer(0.05, state.update_elevator, (1, 2, Direction.UP, False))
+    timer.start()
+    assert state.wait_for_change(token, timeout=5.0) is True
+    timer.join()
+    assert state.wait_for_change(token, timeout=0) is True  # 已有变化时立即返回
+
+def test_lock_free_reads_are_consistent():
+    """写者每次写入的楼层、方向、门状态满足同一约束，读者读到的任何快照都不应只写了一半"""
+    state = _manager()
+    done = threading.Event()
+
+    def writer(eid):
+        floor = 1
+        while not done.is_set():
+            floor = floor % 10 + 1
+            state.update_elevator(eid, floor, Direction.UP if floor % 2 else Direction.DOWN, floor > 5)
+
+    def consistent(car):
+        return car["direction"] == (Direction.UP if car["floor"] % 2 else Direction.DOWN) \
+            and car["door_open"] == (car["floor"] > 5)
+
+    for eid in (1, 2, 3):
+        state.update_elevator(eid, 1, Direction.UP, False)
+    threads = [threading.Thread(target=writer, args=(eid,)) for eid in (1, 2, 3)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(2000):
+            snapshot = state.get_snapshot()
+            assert all(consistent(car) for car in snapshot["elevators"].values())
+            assert consistent(state.elevator(2))
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
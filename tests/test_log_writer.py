@@ -0,0 +1,104 @@
+# tests/test_log_writer.py
+"""LogWriter：后台批量写入、flush 语义、jsonl 格式，以及按大小 / 时间轮转。"""
+import json
+import os
+import time
+
+import pytest
+
+from log_writer import LogWriter
+
+
+def _lines(path) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+def _wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        LogWriter(str(tmp_path / "log.txt"), fmt="xml")
+
+def test_flush_waits_for_all_entries(tmp_path):
+    path = str(tmp_path / "log.txt")
+    writer = LogWriter(path, batch_size=1000, flush_interval=60.0)
+    for i in range(500):
+        writer.write(f"第 {i} 条")
+    writer.flush()
+    assert _lines(path) == [f"第 {i} 条" for i in range(500)]
+    writer.close()
+
+def test_entries_stay_buffered_until_a_flush_is_due(tmp_path):
+    path = str(tmp_path / "log.txt")
+    writer = LogWriter(path, batch_size=10, flush_interval=60.0)
+    for i in range(5):
+        writer.write(str(i))
+    time.sleep(0.2)
+    assert _lines(path) == []  # 未满 batch_size 且未到 flush_interval：还在文件缓冲区中
+    for i in range(5, 10):
+        writer.write(str(i))
+    assert _wait_for(lambda: len(_lines(path)) == 10)  # 累计满 batch_size 条立即 flush
+    writer.close()
+
+def test_flush_interval_bounds_the_delay(tmp_path):
+    path = str(tmp_path / "log.txt")
+    writer = LogWriter(path, batch_size=1000, flush_interval=0.1)
+    writer.write("延迟落盘")
+    assert _wait_for(lambda: _lines(path) == ["延迟落盘"], timeout=1.0)
+    writer.close()
+
+def test_close_writes_the_rest(tmp_path):
+    path = str(tmp_path / "log.txt")
+    writer = LogWriter(path, batch_size=1000, flush_interval=60.0)
+    writer.write("最后一条")
+    writer.close()
+    assert _lines(path) == ["最后一条"]
+    writer.close()  # 重复关闭无副作用
+
+def test_jsonl_format(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    writer = LogWriter(path, fmt="jsonl")
+    writer.write("到达", elevator=2, floor=7)
+    writer.close()
+    record, = [json.loads(line) for line in _lines(path)]
+    assert record["msg"] == "到达" and record["elevator"] == 2 and record["floor"] == 7
+    assert abs(record["t"] - time.time()) < 60
+
+def test_rotation_by_size(tmp_path):
+    path = str(tmp_path / "log.txt")
+    writer = LogWriter(path, batch_size=1, max_bytes=100, backup_count=2)
+    for i in range(100):
+        writer.write(f"{i:09d}")  # 每行 10 字节
+        writer.flush()
+    writer.close()
+    kept = _lines(f"{path}.2") + _lines(f"{path}.1") + _lines(path)
+    assert not os.path.exists(f"{path}.3")
+    assert kept == [f"{i:09d}" for i in range(100 - len(kept), 100)]
+    assert all(os.path.getsize(p) <= 100 for p in (path, f"{path}.1", f"{path}.2"))
+
+def test_rotation_by_time(tmp_path):
+    path = str(tmp_path / "log.txt")
+    writer = LogWriter(path, max_bytes=0, rotate_interval=0.05, backup_count=5)
+    writer.write("第一段")
+    writer.flush()
+    time.sleep(0.1)
+    writer.write("第二段")
+    writer.close()
+    assert _lines(f"{path}.1") == ["第一段"] and _lines(path) == ["第二段"]
+
+def test_appends_to_existing_file(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_text("旧日志\n", encoding="utf-8")
+    writer = LogWriter(str(path))
+    writer.write("新日志")
+    writer.close()
+    assert _lines(str(path)) == ["旧日志", "新日志"]
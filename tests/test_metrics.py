@@ -0,0 +1,49 @@
+# tests/test_metrics.py
+"""Histogram 的流式分位数：最近秩定义、相对误差上限与边界情况。"""
+import math
+import random
+
+import pytest
+
+from metrics import QUANTILES, RELATIVE_ERROR, Histogram
+
+
+def _nearest_rank(samples, q):
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(q * len(ordered))) - 1]
+
+def _histogram(samples) -> Histogram:
+    histogram = Histogram()
+    for value in samples:
+        histogram.add(value)
+    return histogram
+
+
+def test_empty_histogram_is_nan():
+    histogram = Histogram()
+    assert math.isnan(histogram.quantile(0.5)) and math.isnan(histogram.mean())
+
+def test_two_samples_high_quantiles_are_the_max():
+    histogram = _histogram([1.0, 2.826])
+    assert histogram.quantile(0.95) == histogram.quantile(0.99) == 2.826
+    assert histogram.quantile(0.5) == pytest.approx(1.0, rel=RELATIVE_ERROR)
+
+def test_single_sample():
+    histogram = _histogram([7.2])
+    for q in (0.0, *QUANTILES, 1.0):
+        assert histogram.quantile(q) == pytest.approx(7.2, rel=RELATIVE_ERROR)
+
+def test_zero_bucket():
+    histogram = _histogram([0.0, 0.0, 0.0, 5.0])
+    assert histogram.quantile(0.5) == 0.0
+    assert histogram.quantile(0.99) == 5.0
+
+@pytest.mark.parametrize("count", [3, 10, 20, 101, 5000])
+def test_quantiles_match_nearest_rank(count):
+    rng = random.Random(count)
+    samples = [rng.expovariate(1 / 30) for _ in range(count)]
+    histogram = _histogram(samples)
+    for q in (0.0, 0.1, *QUANTILES, 1.0):
+        assert histogram.quantile(q) == pytest.approx(_nearest_rank(samples, q), rel=RELATIVE_ERROR)
+    assert histogram.quantile(1.0) == max(samples)
+    assert histogram.mean() == pytest.approx(sum(samples) / count)
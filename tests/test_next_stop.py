@@ -0,0 +1,99 @@
+# tests/test_next_stop.py
+"""
+Elevator.next_stop 的差分测试：位图实现的 LOOK 扫描与原先基于请求列表的实现逐一比对
+（下一个停靠楼层、更新后的运行方向与历史方向都必须一致）。
+"""
+import random
+
+import pytest
+
+from building import BuildingConfig
+from dispatcher import Dispatcher, DispatchPolicy
+from elevator import Elevator
+from request import Direction, Request, RequestType, UserIntent
+
+CASES = 20000
+
+# ========== 参考实现：原先基于请求列表的 LOOK 扫描 ==========
+def _serves(request: Request, direction: Direction) -> bool:
+    """沿 direction 运行经过请求楼层时是否停靠：内部请求总是停靠，外部请求需与用户方向一致"""
+    return request.request_type == RequestType.INTERNAL or request.user_intent.value == direction.value
+
+def _sweep_target(requests, direction: Direction) -> int:
+    serving = [r for r in requests if _serves(r, direction)]
+    if direction == Direction.UP:
+        if serving:
+            return min(serving, key=lambda r: r.floor).floor
+        return max(requests, key=lambda r: r.floor).floor
+    if serving:
+        return max(serving, key=lambda r: r.floor).floor
+    return min(requests, key=lambda r: r.floor).floor
+
+def reference_next_stop(current: int, direction: Direction, history: Direction, requests):
+    """返回 (下一个停靠楼层, 运行方向, 历史方向)；requests 为内部请求在前、外部请求在后的列表"""
+    if not requests:
+        return None, Direction.NONE, direction
+
+    current_requests = [r for r in requests if r.floor == current]
+    ups = [r for r in requests if r.floor > current]
+    downs = [r for r in requests if r.floor < current]
+
+    if direction == Direction.NONE:
+        if current_requests:
+            return current, direction, history
+        if history == Direction.UP and ups:
+            direction = Direction.UP
+        elif history == Direction.DOWN and downs:
+            direction = Direction.DOWN
+        else:
+            earliest = min(requests, key=lambda r: r.timestamp)
+            direction = Direction.UP if earliest.floor > current else Direction.DOWN
+
+    if direction == Direction.UP:
+        if any(_serves(r, Direction.UP) for r in current_requests):
+            return current, direction, history
+        if ups:
+            return _sweep_target(ups, Direction.UP), direction, history
+        if current_requests:
+            return current, Direction.DOWN, history
+        return _sweep_target(downs, Direction.DOWN), Direction.DOWN, history
+
+    if any(_serves(r, Direction.DOWN) for r in current_requests):
+        return current, direction, history
+    if downs:
+        return _sweep_target(downs, Direction.DOWN), direction, history
+    if current_requests:
+        return current, Direction.UP, history
+    return _sweep_target(ups, Direction.UP), Direction.UP, history
+
+
+# ========== 随机场景 ==========
+def _random_case(rng: random.Random, policy: DispatchPolicy):
+    """随机大楼、电梯状态与内外请求（时间戳只取少数几个值，覆盖"最早请求"的并列情况）"""
+    building = BuildingConfig(2, rng.randint(2, 12))
+    dispatcher = Dispatcher(verbose=False, policy=policy, building=building)
+    elevator = Elevator(1, dispatcher, logger=None)
+    Elevator(2, dispatcher, logger=None)
+    elevator.current_floor = rng.randint(1, building.num_floors)
+    elevator.direction = rng.choice(list(Direction))
+    elevator.history_direction = rng.choice(list(Direction))
+    for _ in range(rng.randint(0, 6)):
+        floor = rng.randint(1, building.num_floors)
+        timestamp = rng.choice([1.0, 2.0, 3.0])
+        if rng.random() < 0.5:
+            elevator.add_request(Request(floor, RequestType.INTERNAL, timestamp=timestamp))
+        else:
+            request = Request(floor, RequestType.EXTERNAL, rng.choice(list(UserIntent)), timestamp=timestamp)
+            dispatcher.add_request(request, rng.choice([1, 2]))
+    return elevator
+
+@pytest.mark.parametrize("policy", [DispatchPolicy.SHARED, DispatchPolicy.MANUAL])
+def test_next_stop_matches_list_reference(policy):
+    rng = random.Random(5)
+    for case in range(CASES):
+        elevator = _random_case(rng, policy)
+        requests = [*elevator.internal_requests, *elevator.dispatcher.get_requests(elevator.elevator_id)]
+        expected = reference_next_stop(elevator.current_floor, elevator.direction, elevator.history_direction,
+                                       requests)
+        actual = (elevator.next_stop(), elevator.direction, elevator.history_direction)
+        assert actual == expected, f"第 {case} 个场景: 楼层 {elevator.current_floor}, 请求 {requests}"
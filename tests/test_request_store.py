@@ -0,0 +1,78 @@
+# tests/test_request_store.py
+"""外部请求索引 RequestStore、快照 RequestSnapshot 与内部请求位图 CabinRequests：随机操作序列与集合实现逐步比对。"""
+import random
+
+from request import Request, RequestType, UserIntent
+from request_store import CabinRequests, RequestStore, request_key
+
+FLOORS = 30
+STEPS = 5000
+
+
+def _nearest(floors, floor, above):
+    candidates = [f for f in floors if (f > floor if above else f < floor)]
+    if not candidates:
+        return None
+    return min(candidates) if above else max(candidates)
+
+
+def test_request_key_is_unique():
+    keys = {request_key(floor, intent) for floor in range(1, FLOORS + 1) for intent in UserIntent}
+    assert len(keys) == 2 * FLOORS
+
+def test_request_store_matches_reference():
+    rng = random.Random(0)
+    store, reference = RequestStore(), {}  # reference: (floor, intent) -> Request，按加入顺序
+    for _ in range(STEPS):
+        floor, intent = rng.randint(1, FLOORS), rng.choice((UserIntent.UP, UserIntent.DOWN))
+        op = rng.random()
+        if op < 0.5:
+            request = Request(floor, RequestType.EXTERNAL, intent)
+            assert store.add(request) == ((floor, intent) not in reference)
+            reference.setdefault((floor, intent), request)
+        elif op < 0.8:
+            assert store.remove(floor, intent) is reference.pop((floor, intent), None)
+        else:
+            removed = store.remove_floor(floor)
+            expected = [reference.pop(key) for key in list(reference) if key[0] == floor]
+            assert sorted(map(id, removed)) == sorted(map(id, expected))
+
+        assert len(store) == len(reference)
+        assert list(store) == list(reference.values())
+        assert store.get(floor, intent) is reference.get((floor, intent))
+        snapshot = store.snapshot()
+        assert snapshot.requests == tuple(reference.values())
+        for each in (UserIntent.UP, UserIntent.DOWN, None):
+            floors = {f for f, i in reference if each is None or i == each}
+            assert snapshot.has_floor(floor, each) == (floor in floors)
+            assert snapshot.nearest_above(floor, each) == _nearest(floors, floor, True)
+            assert snapshot.nearest_below(floor, each) == _nearest(floors, floor, False)
+        assert store.floor_bits() == snapshot.floor_bits()
+
+def test_snapshot_is_not_changed_by_later_writes():
+    store = RequestStore()
+    store.add(Request(3, RequestType.EXTERNAL, UserIntent.UP))
+    snapshot = store.snapshot()
+    store.add(Request(5, RequestType.EXTERNAL, UserIntent.DOWN))
+    store.remove(3, UserIntent.UP)
+    assert [r.floor for r in snapshot] == [3]
+    assert snapshot.floor_bits() == 1 << 3
+
+def test_cabin_requests_match_reference():
+    rng = random.Random(1)
+    cabin, reference = CabinRequests(), {}
+    for _ in range(STEPS):
+        floor = rng.randint(1, FLOORS)
+        if rng.random() < 0.55:
+            request = Request(floor, RequestType.INTERNAL)
+            assert cabin.add(request) == (floor not in reference)
+            reference.setdefault(floor, request)
+        else:
+            assert cabin.remove(floor) is reference.pop(floor, None)
+
+        assert len(cabin) == len(reference)
+        assert list(cabin) == list(reference.values())  # 按按下顺序
+        assert cabin.bits == sum(1 << f for f in reference)
+        assert (floor in cabin) == (floor in reference)
+        assert cabin.nearest_above(floor) == _nearest(reference, floor, True)
+        assert cabin.nearest_below(floor) == _nearest(reference, floor, False)
@@ -0,0 +1,104 @@
+# tests/test_traffic.py
+"""交通轨迹：JSON 行的解析与校验，以及电梯号错误的轨迹在提交任何请求之前就失败。"""
+import threading
+
+import pytest
+
+from building import BuildingConfig
+from dispatcher import Dispatcher
+from elevator import Elevator
+from request import RequestType, UserIntent
+from simulation import Simulation
+from traffic import TraceEntry, TraceFile, poisson_traffic, replay, replay_live, write_trace
+
+BUILDING = BuildingConfig(num_elevators=3, num_floors=10)
+
+
+def _entries(car):
+    """两条合法请求之后跟一条电梯号为 car 的内部请求"""
+    return [TraceEntry(0.0, 5, RequestType.EXTERNAL, UserIntent.UP),
+            TraceEntry(1.0, 3, RequestType.INTERNAL, elevator_id=1),
+            TraceEntry(2.0, 7, RequestType.INTERNAL, elevator_id=car)]
+
+def _live_elevators():
+    dispatcher = Dispatcher(verbose=False, building=BUILDING)
+    return [Elevator(eid, dispatcher, logger=None) for eid in BUILDING.elevator_ids()], dispatcher
+
+
+def test_json_round_trip():
+    for entry in poisson_traffic("lunch", BUILDING, duration=600.0, seed=3):
+        again = TraceEntry.from_json(entry.to_json())
+        assert (again.floor, again.request_type, again.user_intent, again.elevator_id) == \
+               (entry.floor, entry.request_type, entry.user_intent, entry.elevator_id)
+        assert again.at == pytest.approx(entry.at, abs=1e-3)
+
+@pytest.mark.parametrize("line", [
+    '{"t": 1, "floor": 3, "type": "INTERNAL"}',
+    '{"t": 1, "floor": 3, "type": "INTERNAL", "car": null}',
+    '{"t": 1, "floor": 3, "type": "INTERNAL", "car": "2"}',
+    '{"t": 1, "floor": 3, "type": "INTERNAL", "car": 1.5}',
+    '{"t": 1, "floor": 3, "type": "INTERNAL", "car": true}',
+    '{"t": 1, "floor": 3, "type": "EXTERNAL", "intent": "UP", "car": "2"}',
+])
+def test_from_json_rejects_bad_car(line):
+    with pytest.raises(ValueError):
+        TraceEntry.from_json(line)
+
+def test_external_entry_may_omit_car():
+    entry = TraceEntry.from_json('{"t": 1, "floor": 3, "type": "EXTERNAL", "intent": "DOWN"}')
+    assert entry.elevator_id is None and entry.user_intent == UserIntent.DOWN
+
+@pytest.mark.parametrize("car", [0, -1, 4, None])
+def test_replay_fails_before_submitting(car):
+    sim = Simulation(BUILDING)
+    with pytest.raises(ValueError):
+        replay(sim, _entries(car))
+    sim.run()
+    assert sim.metrics()["requests"] == 0
+
+@pytest.mark.parametrize("car", [0, 4, None])
+def test_replay_live_fails_before_submitting(car):
+    elevators, dispatcher = _live_elevators()
+    submitted = []
+    with pytest.raises(ValueError):
+        replay_live(_entries(car), elevators, dispatcher, stop_event=threading.Event(),
+                    on_request=submitted.append)
+    assert submitted == []
+    assert not dispatcher.get_requests() and not any(e.internal_requests for e in elevators)
+
+def test_trace_file_is_checked_before_replay(tmp_path):
+    path = str(tmp_path / "trace.jsonl.gz")
+    write_trace(_entries(9), path)
+    sim = Simulation(BUILDING)
+    with pytest.raises(ValueError):
+        replay(sim, TraceFile(path))
+    sim.run()
+    assert sim.metrics()["requests"] == 0
+
+def test_generator_is_checked_entry_by_entry():
+    sim = Simulation(BUILDING)
+    replay(sim, iter(_entries(4)))
+    with pytest.raises(ValueError):
+        sim.run()
+    assert sim.metrics()["requests"] == 2
+
+@pytest.mark.parametrize("car", [0, 4])
+def test_submit_rejects_out_of_range_car(car):
+    sim = Simulation(BUILDING)
+    with pytest.raises(ValueError):
+        sim.call(0.0, 5, RequestType.INTERNAL, elevator_id=car)
+        sim.run()
+    with pytest.raises(ValueError):
+        sim.call(0.0, 5, RequestType.EXTERNAL, UserIntent.UP, elevator_id=car)
+        sim.run()
+    with pytest.raises(ValueError):
+        sim.call(0.0, 5, RequestType.INTERNAL)
+        sim.run()
+    assert sim.metrics()["requests"] == 0
+
+def test_valid_trace_is_served():
+    sim = Simulation(BUILDING)
+    replay(sim, _entries(3))
+    sim.run()
+    summary = sim.metrics()
+    assert summary["requests"] == 3 and summary["hall_calls_served"] == 1 and summary["pending"] == 0
@@ -0,0 +1,285 @@
+# traffic.py
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+import threading
+from typing import Callable, Iterable, Iterator, Tuple
+
+from building import BuildingConfig
+from dispatcher import Dispatcher, DispatchPolicy
+from request import Request, RequestType, UserIntent
+from simulation import Simulation
+
+LOBBY = 1  # 大堂所在楼层
+
+class TraceEntry:
+    """
+    交通轨迹中的一条请求（JSON Lines 中的一行）：
+    {"t": 12.5, "floor": 7, "type": "EXTERNAL", "intent": "UP"}
+    {"t": 13.0, "floor": 3, "type": "INTERNAL", "car": 2}
+    参数说明：
+    - at: 请求发出的时刻（秒，相对轨迹起点，或录制时的绝对时间戳）
+    - floor: 请求楼层
+    - request_type: INTERNAL / EXTERNAL
+    - user_intent: 外部请求的用户方向
+    - elevator_id: 内部请求所在的电梯；外部请求为用户呼叫的电梯（可为空）
+    """
+    __slots__ = ("at", "floor", "request_type", "user_intent", "elevator_id")
+
+    def __init__(self, at: float, floor: int, request_type: RequestType,
+                 user_intent: UserIntent = None, elevator_id: int = None):
+        self.at = at
+        self.floor = floor
+        self.request_type = request_type
+        self.user_intent = user_intent
+        self.elevator_id = elevator_id
+
+    def to_request(self, timestamp: float) -> Request:
+        return Request(self.floor, self.request_type, self.user_intent, timestamp=timestamp)
+
+    def to_json(self) -> str:
+        record = {"t": round(self.at, 3), "floor": self.floor, "type": self.request_type.value}
+        if self.user_intent is not None:
+            record["intent"] = self.user_intent.value
+        if self.elevator_id is not None:
+            record["car"] = self.elevator_id
+        return json.dumps(record)
+
+    @classmethod
+    def from_json(cls, line: str) -> "TraceEntry":
+        record = json.loads(line)
+        intent = record.get("intent")
+        request_type = RequestType(record["type"])
+        car = record.get("car")
+        if car is not None and (not isinstance(car, int) or isinstance(car, bool)):
+            raise ValueError(f"轨迹中的电梯号不是整数: {line.strip()}")
+        if car is None and request_type == RequestType.INTERNAL:
+            raise ValueError(f"内部请求缺少电梯号 car: {line.strip()}")
+        return cls(float(record["t"]), int(record["floor"]), request_type,
+                   UserIntent(intent) if intent else None, car)
+
+    def check(self, num_elevators: int):
+        """校验电梯号：内部请求必须指定，指定时须在 1..num_elevators 内，否则抛出 ValueError"""
+        if self.elevator_id is None:
+            if self.request_type == RequestType.INTERNAL:
+                raise ValueError(f"内部请求缺少电梯号: {self}")
+        elif not 1 <= self.elevator_id <= num_elevators:
+            raise ValueError(f"电梯号超出范围 1..{num_elevators}: {self}")
+
+    def __repr__(self):
+        return f"<TraceEntry t={self.at:.2f} {self.to_json()}>"
+
+
+# ========== 轨迹文件：逐行流式读写，不把整个文件读入内存 ==========
+def _open(path: str, mode: str):
+    # .gz 结尾的轨迹自动压缩 / 解压
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def write_trace(entries: Iterable[TraceEntry], path: str) -> int:
+    """把请求流写入轨迹文件，返回写入的条数"""
+    count = 0
+    with _open(path, "w") as f:
+        for entry in entries:
+            f.write(entry.to_json())
+            f.write("\n")
+            count += 1
+    return count
+
+def read_trace(path: str) -> Iterator[TraceEntry]:
+    """逐行读取轨迹文件（生成器），跳过空行"""
+    with _open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield TraceEntry.from_json(line)
+
+class TraceFile:
+    """可重复遍历的轨迹文件：每次遍历都重新逐行读取，回放前可先完整校验一遍而不把文件读入内存"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self) -> Iterator[TraceEntry]:
+        return read_trace(self.path)
+
+
+# ========== 合成交通流：泊松到达 ==========
+def _upper_floor(rng: random.Random, building: BuildingConfig) -> int:
+    return rng.randint(LOBBY + 1, building.num_floors)
+
+def _up_peak(rng, building):
+    """上班高峰：绝大多数乘客从大堂上楼"""
+    if rng.random() < 0.9:
+        return LOBBY, _upper_floor(rng, building)
+    return _interfloor(rng, building)
+
+def _down_peak(rng, building):
+    """下班高峰：绝大多数乘客从楼上回到大堂"""
+    if rng.random() < 0.9:
+        return _upper_floor(rng, building), LOBBY
+    return _interfloor(rng, building)
+
+def _lunch(rng, building):
+    """午间：进出大堂各占四成，其余为层间往来"""
+    u = rng.random()
+    if u < 0.4:
+        return LOBBY, _upper_floor(rng, building)
+    if u < 0.8:
+        return _upper_floor(rng, building), LOBBY
+    return _interfloor(rng, building)
+
+def _interfloor(rng, building):
+    """层间交通：起点与终点在所有楼层中均匀分布"""
+    origin = rng.randint(1, building.num_floors)
+    destination = rng.randint(1, building.num_floors - 1)
+    return origin, destination + (destination >= origin)
+
+PATTERNS = {
+    "up_peak": _up_peak,
+    "down_peak": _down_peak,
+    "lunch": _lunch,
+    "interfloor": _interfloor,
+}
+
+def poisson_traffic(pattern: str, building: BuildingConfig, duration: float, mean_interval: float = 30.0,
+                    seed: int = None, cabin_share: float = 0.5) -> Iterator[TraceEntry]:
+    """
+    按泊松到达生成 [0, duration) 内的请求流（生成器，按时间顺序，内存占用恒定）。
+    每位乘客按 pattern 抽取 (起点, 终点)：以 1 - cabin_share 的概率表现为起点的外部呼叫，
+    否则表现为某部电梯内前往终点的内部请求（与 add_random_calls 的内外请求比例一致）
+    """
+    if pattern not in PATTERNS:
+        raise ValueError(f"未知的交通模式: {pattern}")
+    sample = PATTERNS[pattern]
+    rng = random.Random(seed)
+    t = rng.expovariate(1 / mean_interval)
+    while t < duration:
+        origin, destination = sample(rng, building)
+        if rng.random() < cabin_share:
+            yield TraceEntry(t, destination, RequestType.INTERNAL,
+                             elevator_id=rng.randint(1, building.num_elevators))
+        else:
+            intent = UserIntent.UP if destination > origin else UserIntent.DOWN
+            yield TraceEntry(t, origin, RequestType.EXTERNAL, intent)
+        t += rng.expovariate(1 / mean_interval)
+
+def add_traffic(sim: Simulation, duration: float, pattern: str = "interfloor", mean_interval: float = 30.0, seed: int = None):
+    """把合成交通流排入离散事件仿真（签名与 simulation.add_random_calls 一致，供参数扫描使用）"""
+    replay(sim, poisson_traffic(pattern, sim.building, duration, mean_interval, seed))
+
+
+# ========== 回放 ==========
+def _rebase(entries: Iterable[TraceEntry], num_elevators: int) -> Iterator[Tuple[float, TraceEntry]]:
+    """
+    把轨迹时间平移为相对第一条请求的偏移量（录制的轨迹通常是绝对时间戳）。
+    entries 可重复遍历时（列表、TraceFile）先完整校验一遍电梯号，错误的轨迹在提交任何请求之前就失败；
+    一次性的迭代器（生成器）无法预先遍历，逐条在提交之前校验
+    """
+    if iter(entries) is not entries:
+        for entry in entries:
+            entry.check(num_elevators)
+    origin = None
+    for entry in entries:
+        entry.check(num_elevators)
+        if origin is None:
+            origin = entry.at
+        yield entry.at - origin, entry
+
+def replay(sim: Simulation, entries: Iterable[TraceEntry], start: float = None):
+    """
+    离散事件仿真回放：从 start（默认当前虚拟时刻）开始按轨迹时间提交请求。
+    事件队列中始终只有下一条请求，多百万条的轨迹也只占常数内存；
+    实时或加速回放由 sim.run(speed=...) 控制
+    """
+    start = sim.now if start is None else start
+    pending = _rebase(entries, len(sim.elevators))
+
+    def _feed(entry: TraceEntry):
+        sim.submit(entry.to_request(sim.now), entry.elevator_id)
+        _schedule_next()
+
+    def _schedule_next():
+        for offset, entry in pending:
+            # 乱序的轨迹不会让虚拟时钟倒退
+            sim.schedule(max(start + offset, sim.now), lambda e=entry: _feed(e))
+            return
+
+    _schedule_next()
+
+def replay_live(entries: Iterable[TraceEntry], elevators, dispatcher: Dispatcher,
+                stop_event: threading.Event = None, on_request: Callable[[Request], None] = None) -> int:
+    """
+    线程模式回放：按真实时间把请求交给运行中的电梯线程，返回提交的请求数。
+    电梯的移动与开关门也按真实时间进行，因此只能实时回放（只压缩到达间隔会变成加大负载，而不是加速）；
+    加速回放请用离散事件仿真（replay() + Simulation.run(speed=...)，或 python traffic.py replay --speed）。
+    内部请求交给 Elevator.add_request，外部请求交给 Dispatcher.add_request（car 字段作为呼叫的电梯）；
+    on_request 为可选回调，每提交一个请求前调用一次（如 Metrics.record_request）
+    """
+    pending = _rebase(entries, len(elevators))
+    wall_start = time.perf_counter()
+    count = 0
+    for offset, entry in pending:
+        lag = offset - (time.perf_counter() - wall_start)
+        if stop_event is not None:
+            if lag > 0 and stop_event.wait(lag):
+                break
+            if stop_event.is_set():
+                break
+        elif lag > 0:
+            time.sleep(lag)
+
+        request = entry.to_request(time.time())
+        if on_request is not None:
+            on_request(request)
+        if entry.request_type == RequestType.INTERNAL:
+            elevators[entry.elevator_id - 1].add_request(request)
+        else:
+            dispatcher.add_request(request, entry.elevator_id)
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="交通流轨迹：生成合成轨迹，或在无界面仿真中回放轨迹")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="生成泊松到达的合成轨迹")
+    gen.add_argument("--pattern", default="interfloor", choices=sorted(PATTERNS), help="交通模式")
+    gen.add_argument("--duration", type=float, default=3600.0, help="时长（秒）")
+    gen.add_argument("--mean-interval", type=float, default=30.0, help="平均到达间隔（秒）")
+    gen.add_argument("--seed", type=int, default=None, help="随机种子")
+    gen.add_argument("--output", "-o", default=None, help="轨迹文件（.jsonl 或 .jsonl.gz，默认输出到终端）")
+
+    rep = sub.add_parser("replay", help="在离散事件仿真中回放轨迹并输出指标")
+    rep.add_argument("trace", help="轨迹文件")
+    rep.add_argument("--policy", default="SHARED", choices=[p.name for p in DispatchPolicy], help="调度策略")
+    rep.add_argument("--speed", type=float, default=None, help="回放速度：1 为实时，>1 为加速，默认尽可能快")
+
+    for p in (gen, rep):
+        p.add_argument("--elevators", type=int, default=5, help="电梯数")
+        p.add_argument("--floors", type=int, default=20, help="楼层数")
+    args = parser.parse_args(argv)
+    building = BuildingConfig(num_elevators=args.elevators, num_floors=args.floors)
+
+    if args.command == "generate":
+        entries = poisson_traffic(args.pattern, building, args.duration, args.mean_interval, args.seed)
+        if args.output:
+            count = write_trace(entries, args.output)
+            print(f"已写入 {count} 条请求到 {args.output}", file=sys.stderr)
+        else:
+            for entry in entries:
+                print(entry.to_json())
+        return
+
+    sim = Simulation(building, policy=DispatchPolicy[args.policy])
+    replay(sim, TraceFile(args.trace))
+    wall_start = time.perf_counter()
+    sim.run(speed=args.speed)
+    print(json.dumps({**sim.metrics(), "wall_time": round(time.perf_counter() - wall_start, 3)}, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()